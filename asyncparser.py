@@ -0,0 +1,200 @@
+import asyncio
+import warnings
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+import requests
+
+from fetchengine import DEFAULT_CONCURRENCY
+from issuemodel import IssueRecord, SubtasksStats
+from jiraclient import JiraClient
+from jiraparser import (
+    JQL_KEYS_CHUNK_SIZE,
+    SEARCH_PAGE_SIZE,
+    JiraJSONParser,
+    JiraRequestError,
+)
+
+""" asyncio API of the issue and board analysis, for services running many analyses on one event loop. Requests are made by the same blocking client as the scripts use, on a thread pool sharing its connection pool, so results are the same as the sync parser ones. """
+
+
+class BoardIssue(NamedTuple):
+    """Analysis of a board issue: sub-tasks stats, or the error fetching them"""
+
+    issue: IssueRecord
+    subtasks_stats: SubtasksStats = SubtasksStats()
+    error: Exception = None
+
+
+# ==============================================================================
+class AsyncJiraParser:
+    """Coroutine counterparts of get_and_parse, get_parse_subtasks and the board
+    search of kanban.py. Any number of them can run at once: requests wait for
+    one of the concurrency threads of the parser, so Jira gets at most
+    concurrency requests at a time whatever the number of callers."""
+
+    def __init__(
+        self,
+        authToken: str = "",
+        jiraBaseAPIURL: str = "",
+        jiraClient: JiraClient = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        issueFields: list = None,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.own_client = jiraClient is None
+        # a pooled connection per concurrency slot
+        self.jira_client = jiraClient or JiraClient(authToken, self.concurrency)
+        # builds the requests, each of its calls is a blocking sequential job
+        self.parser = JiraJSONParser(
+            authToken,
+            jiraBaseAPIURL,
+            jiraClient=self.jira_client,
+            issueFields=issueFields,
+        )
+        # the only limit: a job holds its thread for all of its requests
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="jira-async"
+        )
+
+    async def run(self, fn, *args):
+        """Run a blocking job once one of the concurrency threads is free"""
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, fn, *args
+        )
+
+    async def get_issue_json(self, issueKey: str) -> dict:
+        return await self.run(self.parser.get_issue_json, issueKey)
+
+    async def get_and_parse(self, issueKey: str) -> IssueRecord:
+        return IssueRecord.from_json(await self.get_issue_json(issueKey))
+
+    async def fetch_subtasks(self, parentKeys: list) -> dict:
+        """Sub-tasks of the parents by concurrent bulk searches, as returned by
+        JiraJSONParser.fetch_subtasks: {parent key: {sub-task key: json}}"""
+        chunks = [
+            parentKeys[i : i + JQL_KEYS_CHUNK_SIZE]
+            for i in range(0, len(parentKeys), JQL_KEYS_CHUNK_SIZE)
+        ]
+        results = await asyncio.gather(
+            *[self.run(self.parser.search_subtasks, chunk) for chunk in chunks],
+            return_exceptions=True,
+        )
+
+        subtasks = {}
+        for result in results:
+            # sub-tasks of a failed chunk are requested one by one
+            if isinstance(result, Exception):
+                continue
+            for subtask in result:
+                parentKey = subtask["fields"]["parent"]["key"]
+                subtasks.setdefault(parentKey, {})[subtask["key"]] = subtask
+        return subtasks
+
+    async def get_parse_subtasks(
+        self, issue: IssueRecord, subtasks: dict = None
+    ) -> SubtasksStats:
+        """Sub-tasks estimations of the issue, sub-tasks already fetched by
+        fetch_subtasks can be passed in to skip the search"""
+        if not issue.has_subtasks:
+            return SubtasksStats()
+        if subtasks is None:
+            subtasks = await self.fetch_subtasks([issue.key])
+
+        subtasksJson = dict(subtasks.get(issue.key, {}))
+        # not returned by the search (e.g. moved meanwhile) - fetch directly
+        missingKeys = [key for key, _ in issue.subtasks if key not in subtasksJson]
+        fetched = await asyncio.gather(
+            *[self.get_issue_json(key) for key in missingKeys]
+        )
+        subtasksJson.update(zip(missingKeys, fetched))
+        return SubtasksStats.from_json(issue, subtasksJson)
+
+    async def search_pages(
+        self, jql: str, fields: list = None, pageSize: int = SEARCH_PAGE_SIZE
+    ):
+        """Search results page by page in the query order: once the first page
+        tells the total, the other pages are fetched concurrently, at most
+        2 x concurrency of them ahead of the reader, as by FetchEngine.map.
+        Repeated issues are dropped and skipped ones fetched at the end, as by
+        JiraJSONParser.fetch_search_pages_parallel."""
+        if fields is None:
+            fields = self.parser.issue_fields
+        first = await self.run(self.parser.fetch_search_page, jql, fields, pageSize, 0)
+        seenKeys = set()
+        received = len(first["issues"])
+        yield JiraJSONParser.drop_seen_issues(first, seenKeys)
+        if len(first["issues"]) == 0:
+            return
+
+        # Jira may return less issues per page than asked for
+        pageSize = len(first["issues"])
+        offsets = iter(range(pageSize, first["total"], pageSize))
+        pending = deque()
+        try:
+            while True:
+                # a sliding window: a page is scheduled for every page read
+                for startAt in offsets:
+                    pending.append(
+                        asyncio.ensure_future(
+                            self.run(
+                                self.parser.fetch_search_page,
+                                jql,
+                                fields,
+                                pageSize,
+                                startAt,
+                            )
+                        )
+                    )
+                    if len(pending) >= 2 * self.concurrency:
+                        break
+                if len(pending) == 0:
+                    break
+                page = await pending.popleft()
+                received += len(page["issues"])
+                yield JiraJSONParser.drop_seen_issues(page, seenKeys)
+        finally:
+            # the generator was closed early or a page has failed
+            for pageFuture in pending:
+                pageFuture.cancel()
+
+        if received == len(seenKeys) == first["total"]:
+            return
+        missed = await self.run(self.parser.fetch_missed_issues, jql, fields, seenKeys)
+        if len(missed) > 0:
+            warnings.warn(
+                "search results changed while paging, "
+                + str(len(missed))
+                + " skipped issues fetched again"
+            )
+            yield {"startAt": received, "total": first["total"], "issues": missed}
+
+    async def board_issues(self, jql: str, fields: list = None):
+        """Board analysis as printed by kanban.py, a list of BoardIssue per
+        search page. Sub-tasks of a page are searched in bulk, an issue whose
+        sub-tasks could not be fetched gets the error instead of stats."""
+        async for page in self.search_pages(jql, fields):
+            issues = [IssueRecord.from_json(task) for task in page["issues"]]
+            subtasks = await self.fetch_subtasks(
+                [issue.key for issue in issues if issue.has_subtasks]
+            )
+            results = await asyncio.gather(
+                *[self.get_parse_subtasks(issue, subtasks) for issue in issues],
+                return_exceptions=True,
+            )
+            boardIssues = []
+            for issue, result in zip(issues, results):
+                if isinstance(result, (JiraRequestError, requests.RequestException)):
+                    boardIssues.append(BoardIssue(issue, error=result))
+                elif isinstance(result, Exception):
+                    raise result
+                else:
+                    boardIssues.append(BoardIssue(issue, result))
+            yield boardIssues
+
+    def close(self):
+        self.executor.shutdown()
+        self.parser.fetch_engine.close()
+        if self.own_client:
+            self.jira_client.close()
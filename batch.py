@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+
+import configparser
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import requests
+from boardreport import BatchBoard, board_report
+from fetchengine import FetchEngine
+from hierarchy import HIERARCHY_FIELDS
+from issuecache import IssueCache
+from jiraclient import JiraClient
+from profiler import PROFILER
+from jiraparser import (
+    JiraJSONParser,
+    JiraRequestError,
+    JQL_KEYS_CHUNK_SIZE,
+    STUB_PAGE_SIZE,
+    RED_COLOR,
+    ENDTERM,
+)
+
+""" Analysing several boards at once: issues shared by the boards are fetched only once and board reports are prepared by parallel processes """
+
+
+def board_option(config, section: str, name: str, fallback: str = "") -> str:
+    """Board section option, the [default] one if the board does not set it"""
+    if section in config:
+        return config[section].get(name, config["default"].get(name, fallback))
+    return config["default"].get(name, fallback)
+
+
+def batch_board(config, name: str) -> BatchBoard:
+    """Board of a config section, or of a PROJECT[:filterId] argument"""
+    board_query = {"taskTypes": ["Story", "Task"]}
+    if name in config:
+        board_query["projectId"] = config[name]["issueKey"]
+        if "filterId" in config[name]:
+            board_query["filter"] = int(config[name]["filterId"])
+    else:
+        projectId, _, filterId = name.partition(":")
+        board_query["projectId"] = projectId
+        if filterId:
+            board_query["filter"] = int(filterId)
+
+    return BatchBoard(
+        name=name,
+        jql=JiraJSONParser.form_jql_query(**board_query),
+        rollup_dimensions=tuple(
+            dimension.strip()
+            for dimension in board_option(config, name, "rollups").split(",")
+            if dimension.strip()
+        ),
+        epic_field=board_option(config, name, "epicLinkField", "parent"),
+        epic_rollup=board_option(config, name, "epicRollup", "no").lower()
+        in ("1", "yes", "true", "on"),
+    )
+
+
+def main():
+    # read config
+    config = configparser.ConfigParser()
+    config.read("config.ini")
+
+    # boards given as arguments, all the board sections of config otherwise
+    # --profile prints time spent per phase at exit, --trace FILE records it
+    board_names = PROFILER.configure(sys.argv[1:]) or [
+        section for section in config.sections() if section != "default"
+    ]
+    if len(board_names) == 0:
+        print(RED_COLOR + "Warning" + ENDTERM + ": no boards to analyse")
+        print(
+            "Please add board sections (issueKey, filterId) to config.ini "
+            + "or use boards as command line parameters. Example:"
+        )
+        print("> python batch.py team-a team-b")
+        print("> python batch.py JIRA JIRA:15")
+        exit(1)
+    boards = [batch_board(config, name) for name in board_names]
+
+    auth_token = config["default"]["authentication-token"]
+    jira_base_api_url = config["default"]["jiraURL"] + "/rest/api/2/issue/"
+    fetch_engine = FetchEngine.from_config(config["default"])
+    jira_client = JiraClient.from_config(config["default"])
+    issue_cache = IssueCache.from_config(config["default"])
+
+    # fields needed by all the boards, so every issue is fetched only once
+    issue_fields = JiraJSONParser.fields_from_config(config["default"])
+    for board in boards:
+        if len(board.rollup_dimensions) > 0:
+            # NumPy is needed for the rollups only
+            try:
+                from boardstats import ROLLUP_DIMENSIONS
+            except ImportError:
+                print(
+                    RED_COLOR
+                    + "Warning"
+                    + ENDTERM
+                    + ": rollups need NumPy (pip install numpy)"
+                )
+                exit(1)
+
+            for dimension in board.rollup_dimensions:
+                if dimension not in ROLLUP_DIMENSIONS:
+                    print(
+                        RED_COLOR
+                        + "Warning"
+                        + ENDTERM
+                        + ": unknown rollup "
+                        + dimension
+                    )
+                    print("Supported rollups: " + ",".join(ROLLUP_DIMENSIONS))
+                    exit(1)
+            issue_fields = JiraJSONParser.project_fields(
+                issue_fields, ["assignee", board.epic_field]
+            )
+        if board.epic_rollup:
+            issue_fields = JiraJSONParser.project_fields(
+                issue_fields, HIERARCHY_FIELDS, [board.epic_field]
+            )
+
+    fetcher = JiraJSONParser(
+        auth_token,
+        jira_base_api_url,
+        fetch_engine,
+        jira_client,
+        issue_cache,
+        issue_fields,
+    )
+
+    # board membership: keys only, in board order, and the "updated" of the
+    # issues to revalidate the cached ones
+    board_keys = {}
+    issue_stubs = {}
+    fetch_failed = False
+    for board in boards:
+        try:
+            board_stubs = [
+                issue
+                for page in fetcher.fetch_search_pages(
+                    board.jql, ["updated"], STUB_PAGE_SIZE, parallel=True
+                )
+                for issue in page["issues"]
+            ]
+        except JiraRequestError as error:
+            print(RED_COLOR + "Warning" + ENDTERM + ": " + str(error))
+            print("")
+            continue
+        board_keys[board.name] = [stub["key"] for stub in board_stubs]
+        issue_stubs.update((stub["key"], stub) for stub in board_stubs)
+    distinct_keys = list(
+        dict.fromkeys(key for keys in board_keys.values() for key in keys)
+    )
+    print(
+        "Issues found: {:d} on {:d} boards, {:d} distinct".format(
+            sum(len(keys) for keys in board_keys.values()),
+            len(board_keys),
+            len(distinct_keys),
+        )
+    )
+    print("", flush=True)
+
+    # the union of board issues, then sub-tasks of all the stories among them
+    issues = {}
+    if issue_cache is None:
+        chunks = [
+            distinct_keys[i : i + JQL_KEYS_CHUNK_SIZE]
+            for i in range(0, len(distinct_keys), JQL_KEYS_CHUNK_SIZE)
+        ]
+        for fetched in fetch_engine.map(
+            lambda chunk: fetcher.search_keys(chunk, issue_fields), chunks
+        ):
+            if fetched.error is not None:
+                print(RED_COLOR + "Warning" + ENDTERM + ": " + str(fetched.error))
+                print("")
+                fetch_failed = True
+                continue
+            for issue in fetched.value:
+                issues[issue["key"]] = issue
+    else:
+        # cached issues are revalidated against the "updated" of the board
+        # searches, by the fetcher on the fetch engine: not from its jobs
+        try:
+            for issue in fetcher.resolve_cached_issues(
+                [issue_stubs[key] for key in distinct_keys], issue_fields
+            ):
+                issues[issue["key"]] = issue
+        except (JiraRequestError, requests.RequestException) as error:
+            print(RED_COLOR + "Warning" + ENDTERM + ": " + str(error))
+            print("")
+            fetch_failed = True
+    subtasks = fetcher.fetch_subtasks(
+        [key for key, issue in issues.items() if len(issue["fields"]["subtasks"]) > 0]
+    )
+
+    # reports are prepared in parallel and printed in the boards order
+    processes = config["default"].getint("batchProcesses", os.cpu_count() or 1)
+    with ProcessPoolExecutor(
+        max_workers=max(1, min(processes, len(board_keys) or 1))
+    ) as pool:
+        reports = [
+            pool.submit(
+                board_report,
+                board,
+                [issues[key] for key in board_keys[board.name] if key in issues],
+                {
+                    key: subtasks[key]
+                    for key in board_keys[board.name]
+                    if key in subtasks
+                },
+                auth_token,
+                jira_base_api_url,
+                issue_fields,
+                sys.stdout.isatty(),
+            )
+            for board in boards
+            if board.name in board_keys
+        ]
+        all_printed = True
+        for report in reports:
+            with PROFILER.phase("board report"):
+                text, board_printed = report.result()
+                print(text, end="", flush=True)
+                all_printed = all_printed and board_printed
+
+    fetch_engine.close()
+    jira_client.close()
+    if issue_cache is not None:
+        issue_cache.close()
+
+    # failed issues or boards fail the run, as cron jobs expect
+    if not all_printed or len(board_keys) < len(boards) or fetch_failed:
+        exit(1)
+
+
+# board reports are prepared by child processes which import this module
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+
+import argparse
+import asyncio
+import os
+import sys
+
+import requests
+
+from fakejira import BoardSpec, FakeJira, ServerSpec
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from asyncparser import AsyncJiraParser  # noqa: E402
+from fetchengine import FetchEngine  # noqa: E402
+from jiraclient import JiraClient  # noqa: E402
+from jiraparser import (  # noqa: E402
+    JIRA_ISSUE_API_PATH,
+    JiraJSONParser,
+    JiraRequestError,
+)
+
+""" Check of asyncparser.py against the fake Jira: the board analysis of AsyncJiraParser.board_issues has to be the one of the sync parser, with a sub-task failing to be fetched by both """
+
+CONCURRENCY = 8
+
+
+def sync_board(url: str, jql: str) -> list:
+    """[(issue key, sub-tasks stats, error type name)] by the sync parser, as
+    kanban.py analyses the board"""
+    jiraClient = JiraClient("check", CONCURRENCY, maxRetries=0)
+    fetchEngine = FetchEngine(CONCURRENCY)
+    fetcher = JiraJSONParser(
+        "check", url, fetchEngine=fetchEngine, jiraClient=jiraClient
+    )
+    board = []
+    for page in fetcher.search_pages(jql, parallel=True):
+        issueParsers = []
+        for issueJson in page["issues"]:
+            issueParser = JiraJSONParser(
+                "check", url, fetchEngine=fetchEngine, jiraClient=jiraClient
+            )
+            issueParser.parse_issue_json(issueJson)
+            issueParsers.append(issueParser)
+        subtasks = fetcher.fetch_subtasks(
+            [parser.issue.key for parser in issueParsers if parser.issue_has_subtasks]
+        )
+        for issueParser in issueParsers:
+            error = None
+            try:
+                issueParser.get_parse_subtasks(False, subtasks)
+            except (JiraRequestError, requests.RequestException) as fetchError:
+                error = type(fetchError).__name__
+            board.append((issueParser.issue.key, issueParser.subtasks_stats, error))
+    fetchEngine.close()
+    jiraClient.close()
+    return board
+
+
+async def async_board(url: str, jql: str) -> list:
+    """The same list out of AsyncJiraParser.board_issues"""
+    jiraClient = JiraClient("check", CONCURRENCY, maxRetries=0)
+    parser = AsyncJiraParser(
+        "check", url, jiraClient=jiraClient, concurrency=CONCURRENCY
+    )
+    board = []
+    async for page in parser.board_issues(jql):
+        for boardIssue in page:
+            error = None
+            if boardIssue.error is not None:
+                error = type(boardIssue.error).__name__
+            board.append((boardIssue.issue.key, boardIssue.subtasks_stats, error))
+    parser.close()
+    jiraClient.close()
+    return board
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the async API results")
+    parser.add_argument("--issues", type=int, default=300)
+    args = parser.parse_args()
+
+    fakeJira = FakeJira(BoardSpec(issues=args.issues), ServerSpec(0))
+    url = fakeJira.start() + JIRA_ISSUE_API_PATH
+    jql = JiraJSONParser.form_jql_query(fakeJira.board_spec.project)
+    # a board sub-task missing from the searches, whose own request fails
+    boardKeys = {issue["key"] for issue in fakeJira.search(jql)}
+    fakeJira.broken.add(
+        next(
+            key
+            for key, issue in fakeJira.issues.items()
+            if issue["fields"].get("parent", {}).get("key") in boardKeys
+        )
+    )
+
+    syncBoard = sync_board(url, jql)
+    asyncBoard = asyncio.run(async_board(url, jql))
+    fakeJira.stop()
+
+    failed = [issue for issue in syncBoard if issue[2] is not None]
+    print(
+        "Issues: {:d} sync, {:d} async, {:d} failed".format(
+            len(syncBoard), len(asyncBoard), len(failed)
+        )
+    )
+    if syncBoard != asyncBoard or len(failed) != 1:
+        for syncIssue, asyncIssue in zip(syncBoard, asyncBoard):
+            if syncIssue != asyncIssue:
+                print("sync:  " + str(syncIssue))
+                print("async: " + str(asyncIssue))
+        print("Check failed: async board differs from the sync one")
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
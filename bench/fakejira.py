@@ -0,0 +1,519 @@
+#!/usr/bin/env python
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import NamedTuple
+from urllib.parse import parse_qs, urlparse
+
+""" Local stand-in for the Jira REST API serving a generated board, used by the benchmarks """
+
+ISSUE_API_PATH = "/rest/api/2/issue/"
+SEARCH_API_PATH = "/rest/api/2/search"
+STATUS_API_PATH = "/rest/api/2/status"
+WORKLOG_API_PATH = "/rest/api/2/worklog/"
+# worklogs of a /worklog/updated page
+WORKLOG_PAGE_SIZE = 1000
+# every 30 minutes of time spent is a worklog
+WORKLOG_SECONDS = 1800
+MAX_PAGE_SIZE = 100
+# Jira returns bigger pages when only small fields are requested
+MAX_STUB_PAGE_SIZE = 1000
+STUB_FIELDS = {"key", "updated", "parent"}
+# histories of a changelog expanded in search results, as Jira does
+MAX_SEARCH_HISTORIES = 100
+# workflow order: name, id, status category key
+STATUSES = [
+    ("To Do", "1", "new"),
+    ("In Progress", "3", "indeterminate"),
+    ("Review", "10001", "indeterminate"),
+    ("Done", "10002", "done"),
+]
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.000+0000"
+
+
+class BoardSpec(NamedTuple):
+    """Shape of the generated board"""
+
+    project: str = "BENCH"
+    issues: int = 1000
+    # sub-tasks of every story, tasks have none
+    subtasks: int = 3
+    epics: int = 20
+    # characters of the description of every issue
+    payload: int = 500
+    seed: int = 1
+    # changelog histories of every issue besides its status changes
+    changes: int = 5
+
+
+class ServerSpec(NamedTuple):
+    """Behaviour of the server"""
+
+    port: int = 8765
+    # delay of every response
+    latency_ms: float = 0.0
+    # share of requests answered with 429 and Retry-After
+    rate_429: float = 0.0
+    retry_after_seconds: int = 1
+
+
+def jira_date(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime(DATE_FORMAT)
+
+
+# ==============================================================================
+class FakeJira:
+    """Generated board served over HTTP, counting requests and bytes sent"""
+
+    def __init__(self, boardSpec: BoardSpec = BoardSpec(), serverSpec=ServerSpec()):
+        self.board_spec = boardSpec
+        self.server_spec = serverSpec
+        self.random = random.Random(boardSpec.seed)
+        # separate generator, so injected failures do not change the board
+        self.fault_random = random.Random(boardSpec.seed)
+        self.worklog_random = random.Random(boardSpec.seed)
+        self.lock = threading.Lock()
+        self.issues = {}
+        self.created_at = {}
+        self.updated_at = {}
+        # worklog id: worklog JSON, updatedTime in milliseconds
+        self.worklogs = {}
+        # issues missing from searches, their requests get no answer
+        self.broken = set()
+        self.generate()
+        self.reset_stats()
+        self.server = None
+
+    def generate(self):
+        spec = self.board_spec
+        now = time.time()
+        for i in range(1, spec.epics + 1):
+            self.add_issue(spec.project + "-E" + str(i), "Epic", created=now - 1e7 + i)
+
+        number = 1
+        for i in range(spec.issues):
+            key = spec.project + "-" + str(number)
+            number += 1
+            isStory = i % 2 == 0
+            epic = None
+            if spec.epics > 0:
+                epic = spec.project + "-E" + str(self.random.randint(1, spec.epics))
+            self.add_issue(
+                key, "Story" if isStory else "Task", parent=epic, created=now - 1e6 + i
+            )
+            if not isStory:
+                continue
+            for _ in range(spec.subtasks):
+                subtaskKey = spec.project + "-" + str(number)
+                number += 1
+                self.add_issue(
+                    subtaskKey, "Sub-task", parent=key, created=now - 1e6 + i
+                )
+                self.issues[key]["fields"]["subtasks"].append(
+                    {
+                        "key": subtaskKey,
+                        "fields": {
+                            "status": self.issues[subtaskKey]["fields"]["status"]
+                        },
+                    }
+                )
+        self.aggregate()
+
+    def add_issue(self, key: str, typeName: str, parent: str = None, created=0.0):
+        estimate = self.random.choice([0, 3600, 7200, 14400, 28800])
+        spent = self.random.choice([0, 1800, 3600, 10800])
+        updated = created + self.random.uniform(0, 1e5)
+        status = self.random.choice(STATUSES)
+        fields = {
+            "issuetype": {"name": typeName, "subtask": typeName == "Sub-task"},
+            "status": {
+                "name": status[0],
+                "id": status[1],
+                "statusCategory": {"key": status[2]},
+            },
+            "timetracking": {},
+            "progress": {"progress": spent, "total": max(estimate, spent)},
+            "aggregateprogress": {},
+            "timeestimate": max(0, estimate - spent),
+            "aggregatetimeestimate": 0,
+            "aggregatetimeoriginalestimate": 0,
+            "subtasks": [],
+            "assignee": {"displayName": "User " + str(self.random.randint(1, 10))},
+            "created": jira_date(created),
+            "updated": jira_date(updated),
+            "summary": "Issue " + key,
+            "description": "x" * self.board_spec.payload,
+        }
+        if estimate > 0:
+            fields["timetracking"] = {
+                "originalEstimate": str(estimate // 3600) + "h",
+                "originalEstimateSeconds": estimate,
+                "remainingEstimateSeconds": fields["timeestimate"],
+            }
+            fields["progress"]["percent"] = min(100, spent * 100 // estimate)
+        if spent > 0:
+            fields["timetracking"]["timeSpentSeconds"] = spent
+        if parent is not None:
+            fields["parent"] = {"key": parent}
+        if status[2] == "done":
+            fields["resolutiondate"] = fields["updated"]
+        self.issues[key] = {
+            "id": str(len(self.issues) + 1),
+            "key": key,
+            "fields": fields,
+        }
+        self.created_at[key] = created
+        self.updated_at[key] = updated
+        for _ in range(spent // WORKLOG_SECONDS):
+            self.add_worklog(key, self.worklog_random.uniform(created, updated))
+
+    def add_worklog(self, key: str, started: float):
+        worklogId = str(len(self.worklogs) + 1)
+        self.worklogs[worklogId] = {
+            "id": worklogId,
+            "issueId": self.issues[key]["id"],
+            "started": jira_date(started),
+            "timeSpentSeconds": WORKLOG_SECONDS,
+            "updatedTime": int(started * 1000),
+        }
+
+    def aggregate(self):
+        """Aggregated values of issues: own numbers plus the sub-tasks ones"""
+        for issue in self.issues.values():
+            fields = issue["fields"]
+            subtasks = [self.issues[sub["key"]]["fields"] for sub in fields["subtasks"]]
+            estimate = sum(
+                f["timetracking"].get("originalEstimateSeconds", 0)
+                for f in [fields] + subtasks
+            )
+            spent = sum(f["progress"]["progress"] for f in [fields] + subtasks)
+            total = sum(f["progress"]["total"] for f in [fields] + subtasks)
+            fields["aggregateprogress"] = {"progress": spent, "total": total}
+            if total > 0:
+                fields["aggregateprogress"]["percent"] = spent * 100 // total
+            fields["aggregatetimeestimate"] = sum(
+                f["timeestimate"] for f in [fields] + subtasks
+            )
+            fields["aggregatetimeoriginalestimate"] = estimate
+
+    def touch(self, count: int) -> list:
+        """Log work on random issues now, as people do between runs"""
+        with self.lock:
+            keys = self.random.sample(sorted(self.issues), min(count, len(self.issues)))
+            now = time.time()
+            for key in keys:
+                fields = self.issues[key]["fields"]
+                fields["progress"]["progress"] += WORKLOG_SECONDS
+                fields["progress"]["total"] = max(
+                    fields["progress"]["total"], fields["progress"]["progress"]
+                )
+                fields["updated"] = jira_date(now)
+                self.updated_at[key] = now
+                self.add_worklog(key, now)
+            self.aggregate()
+        return keys
+
+    def changelog(self, key: str) -> list:
+        """Histories of an issue, oldest first: the workflow up to its status
+        and other field changes in between. Generated on request with a
+        generator of its own, so the board stays the same."""
+        issue = self.issues[key]
+        generator = random.Random(self.board_spec.seed * 1000003 + int(issue["id"]))
+        steps = [status[0] for status in STATUSES].index(
+            issue["fields"]["status"]["name"]
+        )
+        times = sorted(
+            generator.uniform(self.created_at[key], self.updated_at[key])
+            for _ in range(steps + self.board_spec.changes)
+        )
+        statusChanges = set(generator.sample(range(len(times)), steps))
+
+        histories = []
+        step = 0
+        for i, changedAt in enumerate(times):
+            if i in statusChanges:
+                item = {
+                    "field": "status",
+                    "from": STATUSES[step][1],
+                    "fromString": STATUSES[step][0],
+                    "to": STATUSES[step + 1][1],
+                    "toString": STATUSES[step + 1][0],
+                }
+                step += 1
+            else:
+                item = {"field": "assignee", "fromString": None, "toString": "User"}
+            histories.append(
+                {"id": str(i + 1), "created": jira_date(changedAt), "items": [item]}
+            )
+        return histories
+
+    # --- requests ------------------------------------------------------
+
+    def search(self, jql: str) -> list:
+        """Issues matching the JQL forms used by the analysis scripts"""
+        issues = [issue for key, issue in self.issues.items() if key not in self.broken]
+
+        keys = re.search(r"key in \(([^)]*)\)", jql) or re.search(r"key = (\S+)()", jql)
+        if keys:
+            wanted = [key.strip().strip('"') for key in keys.group(1).split(",")]
+            issues = [
+                self.issues[key]
+                for key in wanted
+                if key in self.issues and key not in self.broken
+            ]
+
+        parents = re.search(r"parent in \(([^)]*)\)", jql) or re.search(
+            r"(?:parent|cf\[\d+\]) = (\S+)()", jql
+        )
+        if parents:
+            wanted = {key.strip().strip('"') for key in parents.group(1).split(",")}
+            issues = [
+                issue
+                for issue in issues
+                if issue["fields"].get("parent", {}).get("key") in wanted
+            ]
+
+        types = re.search(r"type in \(([^)]*)\)", jql)
+        if types:
+            wanted = {name.strip() for name in types.group(1).split(",")}
+            issues = [
+                issue
+                for issue in issues
+                if issue["fields"]["issuetype"]["name"] in wanted
+            ]
+        for status in re.findall(r"status != (\w+)", jql):
+            issues = [
+                issue for issue in issues if issue["fields"]["status"]["name"] != status
+            ]
+
+        updated = re.search(r"updated >= -(\d+)m", jql)
+        if updated:
+            since = time.time() - int(updated.group(1)) * 60
+            issues = [
+                issue for issue in issues if self.updated_at[issue["key"]] >= since
+            ]
+
+        if "ORDER BY created DESC" in jql:
+            issues.sort(key=lambda issue: issue["fields"]["created"], reverse=True)
+        return issues
+
+    def project(self, issue: dict, fields: str, expand: str = "") -> dict:
+        projected = issue
+        if fields:
+            wanted = fields.split(",")
+            projected = {
+                "id": issue["id"],
+                "key": issue["key"],
+                "fields": {
+                    name: value
+                    for name, value in issue["fields"].items()
+                    if name in wanted
+                },
+            }
+        if "changelog" in expand.split(","):
+            histories = self.changelog(issue["key"])
+            projected = {
+                **projected,
+                "changelog": {
+                    "startAt": 0,
+                    "maxResults": MAX_SEARCH_HISTORIES,
+                    "total": len(histories),
+                    "histories": histories[:MAX_SEARCH_HISTORIES],
+                },
+            }
+        return projected
+
+    def updated_worklogs(self, since: int) -> dict:
+        """A page of ids of worklogs updated after since (milliseconds)"""
+        values = sorted(
+            (
+                {"worklogId": worklog["id"], "updatedTime": worklog["updatedTime"]}
+                for worklog in self.worklogs.values()
+                if worklog["updatedTime"] > since
+            ),
+            key=lambda value: value["updatedTime"],
+        )
+        page = values[:WORKLOG_PAGE_SIZE]
+        return {
+            "values": page,
+            "since": since,
+            "until": page[-1]["updatedTime"] if page else since,
+            "lastPage": len(values) <= WORKLOG_PAGE_SIZE,
+        }
+
+    def respond(self, path: str, query: dict, request: dict = None) -> tuple:
+        """(status code, headers, body) of a GET request, or of a POST one with
+        its JSON request body. None to drop the connection."""
+        with self.lock:
+            rateLimited = self.fault_random.random() < self.server_spec.rate_429
+        if rateLimited:
+            return 429, {"Retry-After": str(self.server_spec.retry_after_seconds)}, b""
+
+        with self.lock:
+            if request is not None and path == WORKLOG_API_PATH + "list":
+                body = [
+                    {
+                        name: value
+                        for name, value in self.worklogs[worklogId].items()
+                        if name != "updatedTime"
+                    }
+                    for worklogId in request.get("ids", [])
+                    if worklogId in self.worklogs
+                ]
+            elif request is not None:
+                return 404, {}, b""
+            elif path == WORKLOG_API_PATH + "updated":
+                body = self.updated_worklogs(int(query.get("since", 0)))
+            elif path == WORKLOG_API_PATH + "deleted":
+                since = int(query.get("since", 0))
+                body = {"values": [], "since": since, "until": since, "lastPage": True}
+            elif path.startswith(ISSUE_API_PATH) and path.endswith("/changelog"):
+                key = path[len(ISSUE_API_PATH) : -len("/changelog")]
+                if key not in self.issues:
+                    return 404, {}, b""
+                histories = self.changelog(key)
+                startAt = int(query.get("startAt", 0))
+                maxResults = min(int(query.get("maxResults", 50)), MAX_PAGE_SIZE)
+                body = {
+                    "startAt": startAt,
+                    "maxResults": maxResults,
+                    "total": len(histories),
+                    "isLast": startAt + maxResults >= len(histories),
+                    "values": histories[startAt : startAt + maxResults],
+                }
+            elif path[len(ISSUE_API_PATH) :] in self.broken:
+                return None
+            elif path.startswith(ISSUE_API_PATH):
+                issue = self.issues.get(path[len(ISSUE_API_PATH) :])
+                if issue is None:
+                    return 404, {}, b""
+                body = self.project(issue, query.get("fields"), query.get("expand", ""))
+            elif path == SEARCH_API_PATH:
+                issues = self.search(query.get("jql", ""))
+                startAt = int(query.get("startAt", 0))
+                fields = query.get("fields")
+                if fields and set(fields.split(",")) <= STUB_FIELDS:
+                    pageSizeLimit = MAX_STUB_PAGE_SIZE
+                else:
+                    pageSizeLimit = MAX_PAGE_SIZE
+                maxResults = min(int(query.get("maxResults", 50)), pageSizeLimit)
+                body = {
+                    "startAt": startAt,
+                    "maxResults": maxResults,
+                    "total": len(issues),
+                    "issues": [
+                        self.project(
+                            issue, query.get("fields"), query.get("expand", "")
+                        )
+                        for issue in issues[startAt : startAt + maxResults]
+                    ],
+                }
+            elif path == STATUS_API_PATH:
+                body = [
+                    {"name": name, "id": statusId, "statusCategory": {"key": category}}
+                    for name, statusId, category in STATUSES
+                ]
+            else:
+                return 404, {}, b""
+            data = json.dumps(body).encode("utf-8")
+        return 200, {"Content-Type": "application/json"}, data
+
+    def count(self, statusCode: int, sent: int):
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["bytes"] += sent
+            if statusCode == 429:
+                self.stats["rate_limited"] += 1
+
+    def reset_stats(self):
+        self.stats = {"requests": 0, "bytes": 0, "rate_limited": 0}
+
+    # --- server --------------------------------------------------------
+
+    def start(self) -> str:
+        """Serve in a background thread, returns the base URL"""
+        fakeJira = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self, request: dict = None):
+                url = urlparse(self.path)
+                query = {
+                    name: values[0] for name, values in parse_qs(url.query).items()
+                }
+                if fakeJira.server_spec.latency_ms > 0:
+                    time.sleep(fakeJira.server_spec.latency_ms / 1000)
+                response = fakeJira.respond(url.path, query, request)
+                if response is None:
+                    self.close_connection = True
+                    return
+                statusCode, headers, data = response
+                self.send_response(statusCode)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                fakeJira.count(statusCode, len(data))
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                self.do_GET(json.loads(self.rfile.read(length) or b"{}"))
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", self.server_spec.port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return "http://127.0.0.1:" + str(self.server.server_address[1])
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Jira serving a generated board")
+    parser.add_argument("--port", type=int, default=ServerSpec().port)
+    parser.add_argument("--project", default=BoardSpec().project)
+    parser.add_argument("--issues", type=int, default=BoardSpec().issues)
+    parser.add_argument("--subtasks", type=int, default=BoardSpec().subtasks)
+    parser.add_argument("--epics", type=int, default=BoardSpec().epics)
+    parser.add_argument("--payload", type=int, default=BoardSpec().payload)
+    parser.add_argument("--seed", type=int, default=BoardSpec().seed)
+    parser.add_argument("--changes", type=int, default=BoardSpec().changes)
+    parser.add_argument("--latency-ms", type=float, default=ServerSpec().latency_ms)
+    parser.add_argument("--rate-429", type=float, default=ServerSpec().rate_429)
+    args = parser.parse_args()
+
+    fakeJira = FakeJira(
+        BoardSpec(
+            args.project,
+            args.issues,
+            args.subtasks,
+            args.epics,
+            args.payload,
+            args.seed,
+            args.changes,
+        ),
+        ServerSpec(args.port, args.latency_ms, args.rate_429),
+    )
+    print("Serving " + str(len(fakeJira.issues)) + " issues at " + fakeJira.start())
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fakeJira.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from fakejira import BoardSpec, FakeJira, ServerSpec
+
+""" Benchmarks of index.py, kanban.py and cycletime.py against the local fake Jira: requests made, bytes transferred, wall time and peak memory of every scenario """
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_RESULTS_FILE = os.path.join(REPO_DIR, "bench", "results.jsonl")
+RESULT_FORMAT = "{:<24} {:>9} {:>6} {:>12} {:>9} {:>10} {:>4}"
+
+# name: (script, arguments, extra config lines, issues touched before the run)
+SCENARIOS = {
+    "kanban": ("kanban.py", [], [], 0),
+    "kanban-jsonl": ("kanban.py", ["--format", "jsonl"], [], 0),
+    "kanban-rollups": (
+        "kanban.py",
+        [],
+        ["rollups=status,type,assignee,epic", "epicRollup=yes"],
+        0,
+    ),
+    "kanban-cache-cold": ("kanban.py", [], ["cacheFile={dir}/cache.db"], 0),
+    "kanban-cache-warm": ("kanban.py", [], ["cacheFile={dir}/cache.db"], 10),
+    "kanban-snapshot": ("kanban.py", [], ["snapshotFile={dir}/snapshot.db"], 10),
+    "kanban-offline": ("kanban.py", [], ["offlineFile={dir}/export.ndjson.gz"], 0),
+    "index-story": ("index.py", ["{project}-1"], [], 0),
+    "index-epic": ("index.py", ["{project}-E1"], [], 0),
+    "index-story-cache-warm": (
+        "index.py",
+        ["{project}-1"],
+        ["cacheFile={dir}/cache.db"],
+        0,
+    ),
+    "kanban-worklog-cold": ("kanban.py", [], ["worklogFile={dir}/worklog.db"], 0),
+    "kanban-worklog-warm": ("kanban.py", [], ["worklogFile={dir}/worklog.db"], 10),
+    "kanban-offline-worklog": (
+        "kanban.py",
+        [],
+        ["offlineFile={dir}/export.ndjson.gz", "worklogFile={dir}/worklog.db"],
+        0,
+    ),
+    "index-offline-worklog": (
+        "index.py",
+        ["{project}-1"],
+        ["offlineFile={dir}/export.ndjson.gz", "worklogFile={dir}/worklog.db"],
+        0,
+    ),
+    "cycletime": ("cycletime.py", [], [], 0),
+    "cycletime-cache-warm": ("cycletime.py", [], ["cacheFile={dir}/cache.db"], 10),
+}
+# scenarios needing the state left by another one
+PREPARE = {
+    "kanban-cache-warm": "kanban-cache-cold",
+    "kanban-snapshot": "kanban-snapshot",
+    "kanban-offline": "export",
+    "kanban-worklog-warm": "kanban-worklog-cold",
+    "kanban-offline-worklog": "export",
+    "index-offline-worklog": "export",
+    "index-story-cache-warm": "index-story-cache-warm",
+    "cycletime-cache-warm": "cycletime-cache-warm",
+}
+# requests of a scenario compared to another one, when both are run:
+# (scenario, comparison, baseline scenario)
+REQUEST_CHECKS = [
+    ("kanban-cache-warm", "<", "kanban"),
+    ("index-story-cache-warm", "<=", "index-story"),
+]
+
+
+def write_config(directory: str, url: str, project: str, lines: list, args):
+    with open(os.path.join(directory, "config.ini"), "w") as configFile:
+        configFile.write("[default]\n")
+        configFile.write("authentication-token=bench\n")
+        configFile.write("jiraURL=" + url + "\n")
+        configFile.write("issueKey=" + project + "\n")
+        configFile.write("concurrency=" + str(args.concurrency) + "\n")
+        configFile.write("maxRequestsPerSecond=" + str(args.max_rps) + "\n")
+        for line in lines:
+            configFile.write(line.format(dir=directory) + "\n")
+
+
+def run_script(directory: str, script: str, arguments: list) -> tuple:
+    """(wall seconds, peak memory MB, return code) of a script run"""
+    startedAt = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(REPO_DIR, script)] + arguments,
+        cwd=directory,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    _, status, usage = os.wait4(process.pid, 0)
+    wallTime = time.perf_counter() - startedAt
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode != 0:
+        sys.stderr.write(process.stderr.read().decode("utf-8", "replace"))
+    process.stderr.close()
+    # ru_maxrss is in KB on Linux, in bytes on macOS
+    peakMemory = usage.ru_maxrss / 1024
+    if sys.platform == "darwin":
+        peakMemory /= 1024
+    return wallTime, peakMemory, process.returncode
+
+
+def run_scenario(name: str, fakeJira: FakeJira, url: str, args) -> dict:
+    script, arguments, lines, touched = SCENARIOS[name]
+    project = fakeJira.board_spec.project
+    arguments = [argument.format(project=project) for argument in arguments]
+
+    with tempfile.TemporaryDirectory(prefix="jira-bench-") as directory:
+        prepare = PREPARE.get(name)
+        if prepare == "export":
+            # the other options of the scenario apply to the export run too
+            write_config(
+                directory,
+                url,
+                project,
+                ["exportFile={dir}/export.ndjson.gz"]
+                + [line for line in lines if not line.startswith("offlineFile=")],
+                args,
+            )
+            run_script(directory, script, arguments)
+        elif prepare is not None:
+            write_config(directory, url, project, SCENARIOS[prepare][2], args)
+            run_script(directory, script, arguments)
+        if touched > 0:
+            fakeJira.touch(touched)
+
+        write_config(directory, url, project, lines, args)
+        fakeJira.reset_stats()
+        wallTime, peakMemory, returnCode = run_script(directory, script, arguments)
+
+    return {
+        "scenario": name,
+        "requests": fakeJira.stats["requests"],
+        "bytes": fakeJira.stats["bytes"],
+        "rate_limited": fakeJira.stats["rate_limited"],
+        "wall_seconds": round(wallTime, 3),
+        "peak_memory_mb": round(peakMemory, 1),
+        "return_code": returnCode,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_DIR,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except OSError:
+        return ""
+
+
+def previous_results(path: str, setup: dict) -> dict:
+    """{scenario: result} of the last stored run with the same setup"""
+    previous = {}
+    if not os.path.exists(path):
+        return previous
+    with open(path) as resultsFile:
+        for line in resultsFile:
+            run = json.loads(line)
+            if run["setup"] == setup:
+                previous = {result["scenario"]: result for result in run["results"]}
+    return previous
+
+
+def change(value: float, previousValue: float) -> str:
+    if not previousValue:
+        return ""
+    return "{:+.0f}%".format((value - previousValue) * 100 / previousValue)
+
+
+def print_header():
+    print(
+        RESULT_FORMAT.format(
+            "scenario", "requests", "429", "bytes", "wall s", "memory MB", "rc"
+        )
+    )
+
+
+def print_results(results: list, previous: dict):
+    for result in results:
+        print(
+            RESULT_FORMAT.format(
+                result["scenario"],
+                result["requests"],
+                result["rate_limited"],
+                result["bytes"],
+                "{:.2f}".format(result["wall_seconds"]),
+                "{:.1f}".format(result["peak_memory_mb"]),
+                result["return_code"],
+            )
+        )
+        before = previous.get(result["scenario"])
+        if before is not None:
+            print(
+                RESULT_FORMAT.format(
+                    " vs previous",
+                    change(result["requests"], before["requests"]),
+                    "",
+                    change(result["bytes"], before["bytes"]),
+                    change(result["wall_seconds"], before["wall_seconds"]),
+                    change(result["peak_memory_mb"], before["peak_memory_mb"]),
+                    "",
+                )
+            )
+
+
+def failed_checks(results: list) -> list:
+    """Messages of the REQUEST_CHECKS not met by the results"""
+    requests = {result["scenario"]: result["requests"] for result in results}
+    failed = []
+    for name, comparison, baseline in REQUEST_CHECKS:
+        if name not in requests or baseline not in requests:
+            continue
+        if comparison == "<":
+            met = requests[name] < requests[baseline]
+        else:
+            met = requests[name] <= requests[baseline]
+        if not met:
+            failed.append(
+                "{} made {:d} requests, expected {} {:d} of {}".format(
+                    name, requests[name], comparison, requests[baseline], baseline
+                )
+            )
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark against a fake Jira")
+    parser.add_argument("scenarios", nargs="*", default=list(SCENARIOS))
+    parser.add_argument("--issues", type=int, default=BoardSpec().issues)
+    parser.add_argument("--subtasks", type=int, default=BoardSpec().subtasks)
+    parser.add_argument("--epics", type=int, default=BoardSpec().epics)
+    parser.add_argument("--payload", type=int, default=BoardSpec().payload)
+    parser.add_argument("--changes", type=int, default=BoardSpec().changes)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--rate-429", type=float, default=ServerSpec().rate_429)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-rps", type=float, default=1000.0)
+    parser.add_argument("--results", default=DEFAULT_RESULTS_FILE)
+    parser.add_argument(
+        "--no-store", action="store_true", help="do not store the results"
+    )
+    args = parser.parse_args()
+
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            print("Unknown scenario " + name)
+            print("Scenarios: " + ",".join(SCENARIOS))
+            exit(1)
+
+    boardSpec = BoardSpec(
+        issues=args.issues,
+        subtasks=args.subtasks,
+        epics=args.epics,
+        payload=args.payload,
+        changes=args.changes,
+    )
+    # free port, the scenario configs point to it
+    fakeJira = FakeJira(boardSpec, ServerSpec(0, args.latency_ms, args.rate_429))
+    url = fakeJira.start()
+
+    # results are comparable between runs of the same setup only
+    setup = {
+        "board": boardSpec._asdict(),
+        "latency_ms": args.latency_ms,
+        "rate_429": args.rate_429,
+        "concurrency": args.concurrency,
+        "max_rps": args.max_rps,
+    }
+    previous = previous_results(args.results, setup)
+
+    print_header()
+    results = []
+    for name in args.scenarios:
+        results.append(run_scenario(name, fakeJira, url, args))
+        print_results(results[-1:], previous)
+        sys.stdout.flush()
+    fakeJira.stop()
+
+    if not args.no_store:
+        with open(args.results, "a") as resultsFile:
+            resultsFile.write(
+                json.dumps(
+                    {
+                        "date": datetime.now(timezone.utc).isoformat(),
+                        "revision": git_revision(),
+                        "python": sys.version.split()[0],
+                        "setup": setup,
+                        "results": results,
+                    }
+                )
+                + "\n"
+            )
+
+    checks = failed_checks(results)
+    for message in checks:
+        print("Check failed: " + message)
+
+    # a failed scenario fails the run, so the suite can guard code paths too
+    if len(checks) > 0 or any(result["return_code"] != 0 for result in results):
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import abc
+import csv
+import json
+
+from issuemodel import IssueRecord, Progress, SubtasksStats, hours
+from jiraparser import ENDTERM, GREEN_COLOR, RED_COLOR, WARN_COLOR
+
+OUTPUT_FORMATS = ["text", "jsonl", "csv"]
+DEFAULT_OUTPUT_FORMAT = "text"
+PROGRESS_COLUMNS = list(Progress._fields)
+CSV_COLUMNS = (
+    [
+        "key",
+        "type",
+        "issue_type",
+        "status",
+        "subtasks",
+        "subtasks_wo_estimation",
+        "error",
+    ]
+    + PROGRESS_COLUMNS
+    + ["aggregate_" + column for column in PROGRESS_COLUMNS]
+)
+
+
+def output_format_argument(arguments: list, default: str) -> tuple:
+    """(output format, the rest of the arguments) out of --format FORMAT or
+    --format=FORMAT"""
+    outputFormat = default
+    rest = []
+    i = 0
+    while i < len(arguments):
+        if arguments[i] == "--format" and i + 1 < len(arguments):
+            outputFormat = arguments[i + 1]
+            i += 1
+        elif arguments[i].startswith("--format="):
+            outputFormat = arguments[i][len("--format=") :]
+        else:
+            rest.append(arguments[i])
+        i += 1
+    return outputFormat, rest
+
+
+class BoardRenderer(abc.ABC):
+    """Writes board issues analysis to a stream, one row per issue. Rows are
+    buffered by the stream and reach the reader on flush, once per page."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    @abc.abstractmethod
+    def issue(self, issue: IssueRecord, subtasksStats: SubtasksStats):
+        pass
+
+    @abc.abstractmethod
+    def error(self, issue: IssueRecord, message: str):
+        pass
+
+    def flush(self):
+        self.stream.flush()
+
+    @staticmethod
+    def new(outputFormat: str, stream, colors: bool = None) -> "BoardRenderer":
+        if outputFormat == "jsonl":
+            return JsonLinesRenderer(stream)
+        if outputFormat == "csv":
+            return CsvRenderer(stream)
+        return TextRenderer(stream, colors)
+
+
+class TextRenderer(BoardRenderer):
+    """The compact text of kanban.py, colored on terminals only"""
+
+    def __init__(self, stream, colors: bool = None):
+        super().__init__(stream)
+        if colors is None:
+            colors = stream.isatty()
+        self.colors = colors
+
+    def color(self, color: str) -> str:
+        return color if self.colors else ""
+
+    def progress_line(self, title: str, progress: Progress, estimateColor="") -> str:
+        end = self.color(ENDTERM)
+        totalColor = ""
+        if progress.total > progress.original_estimate:
+            totalColor = self.color(WARN_COLOR)
+        leftColor = self.color(RED_COLOR if progress.time_left <= 0 else GREEN_COLOR)
+        leftOriginalColor = self.color(
+            RED_COLOR if progress.time_left_original <= 0 else GREEN_COLOR
+        )
+        return "".join(
+            [
+                title,
+                ": e",
+                estimateColor,
+                hours(progress.original_estimate),
+                "h",
+                end if estimateColor else "",
+                ", p",
+                hours(progress.progress),
+                "/",
+                totalColor,
+                hours(progress.total),
+                "h",
+                end if totalColor else "",
+                ", ",
+                str(progress.percent),
+                "%, l",
+                leftColor,
+                hours(progress.time_left),
+                end,
+                ", lo",
+                leftOriginalColor,
+                hours(progress.time_left_original),
+                "h",
+                end,
+            ]
+        )
+
+    def compact_progress(self, issue: IssueRecord) -> str:
+        """Original and aggregated progress, empty if there is none"""
+        lines = []
+        if issue.progress.total > 0 or issue.progress.original_estimate > 0:
+            estimateColor = ""
+            if issue.progress.original_estimate == 0:
+                estimateColor = self.color(RED_COLOR)
+            lines.append(self.progress_line("Original", issue.progress, estimateColor))
+        if issue.aggregate_progress.total > 0 and issue.has_subtasks:
+            lines.append(self.progress_line("Aggregated", issue.aggregate_progress))
+        return "\r\n".join(lines)
+
+    @staticmethod
+    def issue_line(issue: IssueRecord) -> str:
+        return (
+            "Issue: "
+            + issue.key
+            + ", type: "
+            + issue.type_name
+            + ", status: "
+            + issue.status
+            + "\n"
+        )
+
+    def issue(self, issue: IssueRecord, subtasksStats: SubtasksStats):
+        lines = [TextRenderer.issue_line(issue)]
+        if issue.has_subtasks and len(subtasksStats.wo_estimation) > 0:
+            lines.append(
+                "Sub-tasks not estimated: "
+                + ",".join(subtasksStats.wo_estimation)
+                + "\n"
+            )
+        progressLine = self.compact_progress(issue)
+        if len(progressLine) > 0:
+            lines.append(progressLine + "\n")
+        # warn if there is no estimation for task/bug
+        elif issue.type_name.lower() != "story":
+            lines.append("No estimation\n")
+        lines.append("\n")
+        self.stream.write("".join(lines))
+
+    def error(self, issue: IssueRecord, message: str):
+        self.stream.write(
+            TextRenderer.issue_line(issue)
+            + self.color(RED_COLOR)
+            + "Warning"
+            + self.color(ENDTERM)
+            + ": "
+            + message
+            + "\n\n"
+        )
+
+
+class JsonLinesRenderer(BoardRenderer):
+    """A JSON object per issue and line, times in seconds"""
+
+    def issue(self, issue: IssueRecord, subtasksStats: SubtasksStats):
+        row = {
+            "key": issue.key,
+            "type": issue.type_name,
+            "issue_type": issue.original_type_name,
+            "status": issue.status,
+            "subtasks": len(issue.subtasks),
+            "subtasks_wo_estimation": list(subtasksStats.wo_estimation),
+            "progress": issue.progress._asdict(),
+            "aggregate_progress": (
+                issue.aggregate_progress._asdict() if issue.has_subtasks else None
+            ),
+        }
+        self.stream.write(json.dumps(row) + "\n")
+
+    def error(self, issue: IssueRecord, message: str):
+        self.stream.write(json.dumps({"key": issue.key, "error": message}) + "\n")
+
+
+class CsvRenderer(BoardRenderer):
+    """A header row, then a row per issue, times in seconds"""
+
+    def __init__(self, stream):
+        super().__init__(stream)
+        self.writer = csv.DictWriter(stream, CSV_COLUMNS)
+        self.writer.writeheader()
+
+    def issue(self, issue: IssueRecord, subtasksStats: SubtasksStats):
+        row = {
+            "key": issue.key,
+            "type": issue.type_name,
+            "issue_type": issue.original_type_name,
+            "status": issue.status,
+            "subtasks": len(issue.subtasks),
+            "subtasks_wo_estimation": ",".join(subtasksStats.wo_estimation),
+        }
+        row.update(issue.progress._asdict())
+        if issue.has_subtasks:
+            for column, value in issue.aggregate_progress._asdict().items():
+                row["aggregate_" + column] = value
+        self.writer.writerow(row)
+
+    def error(self, issue: IssueRecord, message: str):
+        self.writer.writerow({"key": issue.key, "error": message})
@@ -0,0 +1,108 @@
+import io
+import sys
+from contextlib import redirect_stdout
+from typing import NamedTuple
+
+import requests
+from boardrender import BoardRenderer, TextRenderer
+from hierarchy import HierarchyIndex
+from jiraparser import JiraJSONParser, JiraRequestError
+
+
+class BatchBoard(NamedTuple):
+    """Board of a batch run: a config section or a project given in arguments"""
+
+    name: str
+    jql: str
+    rollup_dimensions: tuple = ()
+    epic_field: str = "parent"
+    epic_rollup: bool = False
+
+
+def print_issue(issue_parser: JiraJSONParser, subtasks: dict, renderer: BoardRenderer):
+    # if there are subtasks - count their estimations, the ones fetched
+    # directly are passed back
+    if issue_parser.issue_has_subtasks:
+        subtasks[issue_parser.issue_key] = issue_parser.parse_subtasks_json(
+            subtasks.get(issue_parser.issue_key, {})
+        )
+    renderer.issue(issue_parser.issue, issue_parser.subtasks_stats)
+
+
+def print_issues(
+    issue_parsers: list, subtasks: dict, renderer: BoardRenderer = None
+) -> bool:
+    """Print issues analysis, returns False if any of them could not be fetched
+    (Jira error or connection failure).
+    Text goes to the current stdout unless a renderer is given, rows reach the
+    reader once all the issues are written. Sub-tasks missing in subtasks are
+    fetched and added to it."""
+    if renderer is None:
+        renderer = TextRenderer(sys.stdout)
+    all_printed = True
+    for issue_parser in issue_parsers:
+        try:
+            print_issue(issue_parser, subtasks, renderer)
+        except (JiraRequestError, requests.RequestException) as error:
+            renderer.error(issue_parser.issue, str(error))
+            all_printed = False
+    renderer.flush()
+    return all_printed
+
+
+def board_report(
+    board: BatchBoard,
+    issues: list,
+    subtasks: dict,
+    authToken: str,
+    jiraBaseAPIURL: str,
+    issueFields: list,
+    colors: bool = False,
+) -> tuple:
+    """Analysis of already fetched board issues as printed by kanban.py.
+    Runs in batch worker processes, so the report is returned as text, colored
+    for the terminal of the parent process: (text, all issues printed)."""
+    board_columns = None
+    if len(board.rollup_dimensions) > 0:
+        # NumPy is needed for the rollups only
+        from boardstats import BoardColumns
+
+        board_columns = BoardColumns(board.epic_field)
+    board_hierarchy = None
+    if board.epic_rollup:
+        board_hierarchy = HierarchyIndex(board.epic_field)
+
+    report = io.StringIO()
+    renderer = TextRenderer(report, colors)
+    all_printed = True
+    with redirect_stdout(report):
+        print("Board: " + board.name)
+        print("Issues found: {:d}".format(len(issues)))
+        for task in issues:
+            issue_parser = JiraJSONParser(
+                authToken, jiraBaseAPIURL, issueFields=issueFields
+            )
+            issue_parser.parse_issue_json(task)
+            task_subtasks = subtasks.get(task["key"], {})
+            if board_columns is not None:
+                board_columns.add(issue_parser.issue, task)
+            if board_hierarchy is not None:
+                board_hierarchy.add(task)
+                for subtask in task_subtasks.values():
+                    board_hierarchy.add(subtask)
+            all_printed = (
+                print_issues([issue_parser], {task["key"]: task_subtasks}, renderer)
+                and all_printed
+            )
+
+        if board_columns is not None:
+            for dimension in board.rollup_dimensions:
+                board_columns.print_rollup(dimension)
+            board_columns.print_overrun_distribution()
+
+        if board_hierarchy is not None:
+            hierarchy_rollups = board_hierarchy.rollup()
+            board_hierarchy.print_epics(hierarchy_rollups)
+            board_hierarchy.print_mismatches(hierarchy_rollups)
+
+    return report.getvalue(), all_printed
@@ -0,0 +1,126 @@
+import json
+import math
+import sqlite3
+import time
+import zlib
+from datetime import datetime
+
+DEFAULT_FULL_REFRESH_HOURS = 24
+# extra minutes added to the "updated" window, covers clock skew and
+# changes made while the previous run was fetching
+UPDATED_WINDOW_MARGIN_MINUTES = 2
+
+
+# ==============================================================================
+class BoardSnapshot:
+    """Local (SQLite) snapshot of a board: issues JSON and their sub-tasks for
+    one JQL query, so following runs fetch only the issues updated since"""
+
+    def __init__(
+        self,
+        path: str,
+        jql: str,
+        fullRefreshHours: int = DEFAULT_FULL_REFRESH_HOURS,
+    ):
+        self.jql = jql
+        self.full_refresh = fullRefreshHours * 3600
+        # transactions are opened and committed explicitly per run
+        self.db = sqlite3.connect(path, isolation_level=None)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " jql TEXT PRIMARY KEY, started_at REAL NOT NULL,"
+            " full_started_at REAL NOT NULL)"
+        )
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS issues ("
+            " jql TEXT NOT NULL, key TEXT NOT NULL, id INTEGER NOT NULL,"
+            " created REAL NOT NULL, issue BLOB NOT NULL, subtasks BLOB NOT NULL,"
+            " PRIMARY KEY (jql, key))"
+        )
+
+    @staticmethod
+    def from_config(config, jql: str) -> "BoardSnapshot":
+        """Snapshot defined by a config section, None if it is not turned on"""
+        if "snapshotFile" not in config:
+            return None
+        return BoardSnapshot(
+            config["snapshotFile"],
+            jql,
+            config.getint("snapshotFullRefreshHours", DEFAULT_FULL_REFRESH_HOURS),
+        )
+
+    def begin(self):
+        self.db.execute("BEGIN")
+
+    def updated_window_minutes(self) -> int:
+        """Minutes to look back for updated issues, None if a full run is due"""
+        row = self.db.execute(
+            "SELECT started_at, full_started_at FROM runs WHERE jql = ?", (self.jql,)
+        ).fetchone()
+        now = time.time()
+        if row is None or row[1] + self.full_refresh < now:
+            return None
+        return math.ceil((now - row[0]) / 60) + UPDATED_WINDOW_MARGIN_MINUTES
+
+    def finish(self, startedAt: float, full: bool):
+        fullStartedAt = startedAt
+        if not full:
+            fullStartedAt = self.db.execute(
+                "SELECT full_started_at FROM runs WHERE jql = ?", (self.jql,)
+            ).fetchone()[0]
+        self.db.execute(
+            "INSERT OR REPLACE INTO runs VALUES (?, ?, ?)",
+            (self.jql, startedAt, fullStartedAt),
+        )
+        self.db.execute("COMMIT")
+
+    def clear(self):
+        self.db.execute("DELETE FROM issues WHERE jql = ?", (self.jql,))
+
+    def put(self, issueJson: dict, subtasks: dict):
+        self.db.execute(
+            "INSERT OR REPLACE INTO issues VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                self.jql,
+                issueJson["key"],
+                int(issueJson["id"]),
+                datetime.strptime(
+                    issueJson["fields"]["created"], "%Y-%m-%dT%H:%M:%S.%f%z"
+                ).timestamp(),
+                zlib.compress(json.dumps(issueJson).encode("utf-8")),
+                zlib.compress(json.dumps(subtasks).encode("utf-8")),
+            ),
+        )
+
+    def remove(self, issueKeys: list):
+        self.db.executemany(
+            "DELETE FROM issues WHERE jql = ? AND key = ?",
+            [(self.jql, key) for key in issueKeys],
+        )
+
+    def keys(self) -> set:
+        return {
+            row[0]
+            for row in self.db.execute(
+                "SELECT key FROM issues WHERE jql = ?", (self.jql,)
+            )
+        }
+
+    def count(self) -> int:
+        return self.db.execute(
+            "SELECT COUNT(*) FROM issues WHERE jql = ?", (self.jql,)
+        ).fetchone()[0]
+
+    def issues(self):
+        """Yield (issue JSON, sub-tasks JSON) pairs in board order (created desc)"""
+        for issue, subtasks in self.db.execute(
+            "SELECT issue, subtasks FROM issues WHERE jql = ?"
+            " ORDER BY created DESC, id DESC",
+            (self.jql,),
+        ):
+            yield json.loads(zlib.decompress(issue)), json.loads(
+                zlib.decompress(subtasks)
+            )
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,184 @@
+import numpy as np
+
+from issuemodel import IssueRecord, epic_key
+
+ROLLUP_DIMENSIONS = ["status", "type", "assignee", "epic"]
+# overrun (hours over the original estimation) histogram bins
+OVERRUN_BINS_HOURS = [0, 1, 2, 4, 8, 16, 40, np.inf]
+NO_VALUE_LABEL = "None"
+ROLLUP_HEADER_FORMAT = "{:<24} {:>6} {:>6} {:>9} {:>9} {:>9} {:>9} {:>7} {:>6}"
+ROLLUP_ROW_FORMAT = (
+    "{:<24.24} {:>6d} {:>6d} {:>8.1f}h {:>8.1f}h {:>8.1f}h {:>8.1f}h {:>7d} {:>6.2f}"
+)
+
+
+# ==============================================================================
+class BoardColumns:
+    """Columnar board model: one NumPy array per value of the parsed issues,
+    categorical values stored as integer codes. Stories are represented by
+    their aggregated (sub-tasks included) numbers."""
+
+    def __init__(self, epicField: str = "parent", capacity: int = 1024):
+        self.epic_field = epicField
+        self.size = 0
+        # seconds
+        self.original_estimate = np.zeros(capacity, dtype=np.int64)
+        self.total = np.zeros(capacity, dtype=np.int64)
+        self.progress = np.zeros(capacity, dtype=np.int64)
+        self.time_left = np.zeros(capacity, dtype=np.int64)
+        self.time_left_original = np.zeros(capacity, dtype=np.int64)
+        # codes into self.labels[dimension]
+        self.codes = {
+            dimension: np.zeros(capacity, dtype=np.int32)
+            for dimension in ROLLUP_DIMENSIONS
+        }
+        self.labels = {dimension: [] for dimension in ROLLUP_DIMENSIONS}
+        self.label_codes = {dimension: {} for dimension in ROLLUP_DIMENSIONS}
+
+    def fields(self) -> list:
+        """Issue fields needed on top of the parsed ones"""
+        return ["assignee", self.epic_field]
+
+    def add(self, issue: IssueRecord, issueJson: dict):
+        if self.size == len(self.total):
+            self._grow()
+
+        progress = issue.aggregate_progress if issue.has_subtasks else issue.progress
+        i = self.size
+        self.original_estimate[i] = progress.original_estimate
+        self.total[i] = progress.total
+        self.progress[i] = progress.progress
+        self.time_left[i] = progress.time_left
+        self.time_left_original[i] = progress.time_left_original
+
+        fields = issueJson["fields"]
+        assignee = fields.get("assignee") or {}
+        self._set_code("status", i, issue.status)
+        self._set_code("type", i, issue.original_type_name)
+        self._set_code("assignee", i, assignee.get("displayName"))
+        self._set_code("epic", i, epic_key(fields, self.epic_field))
+        self.size += 1
+
+    def _set_code(self, dimension: str, i: int, label: str):
+        label = label or NO_VALUE_LABEL
+        codes = self.label_codes[dimension]
+        if label not in codes:
+            codes[label] = len(self.labels[dimension])
+            self.labels[dimension].append(label)
+        self.codes[dimension][i] = codes[label]
+
+    def _grow(self):
+        capacity = len(self.total) * 2
+        for name in [
+            "original_estimate",
+            "total",
+            "progress",
+            "time_left",
+            "time_left_original",
+        ]:
+            setattr(self, name, np.resize(getattr(self, name), capacity))
+        for dimension in ROLLUP_DIMENSIONS:
+            self.codes[dimension] = np.resize(self.codes[dimension], capacity)
+
+    def rollup(self, dimension: str) -> list:
+        """Sums per dimension value, rows sorted by total descending:
+        (label, issues, estimated issues, original estimate, total, progress,
+        time left, overrun issues, overrun ratio)"""
+        n = self.size
+        codes = self.codes[dimension][:n]
+        groups = len(self.labels[dimension])
+        estimated = self.original_estimate[:n] > 0
+        overrun = estimated & (self.time_left_original[:n] < 0)
+
+        def sums(values):
+            return np.bincount(codes, weights=values, minlength=groups)
+
+        issues = np.bincount(codes, minlength=groups)
+        estimatedIssues = sums(estimated)
+        originalEstimate = sums(self.original_estimate[:n])
+        total = sums(self.total[:n])
+        progress = sums(self.progress[:n])
+        timeLeft = sums(self.time_left[:n])
+        overrunIssues = sums(overrun)
+        # spent + left against the original estimation of estimated issues only
+        estimatedTotal = sums(np.where(estimated, self.total[:n], 0))
+        overrunRatio = np.divide(
+            estimatedTotal,
+            originalEstimate,
+            out=np.zeros(groups),
+            where=originalEstimate > 0,
+        )
+
+        rows = []
+        for code in np.argsort(-total, kind="stable"):
+            rows.append(
+                (
+                    self.labels[dimension][code],
+                    int(issues[code]),
+                    int(estimatedIssues[code]),
+                    int(originalEstimate[code]),
+                    int(total[code]),
+                    int(progress[code]),
+                    int(timeLeft[code]),
+                    int(overrunIssues[code]),
+                    float(overrunRatio[code]),
+                )
+            )
+        return rows
+
+    def overrun_distribution(self) -> list:
+        """Histogram of hours spent over the original estimation:
+        (from hours, to hours, issues)"""
+        overrunHours = -self.time_left_original[: self.size] / 3600
+        overrunHours = overrunHours[
+            (self.original_estimate[: self.size] > 0) & (overrunHours > 0)
+        ]
+        counts, _ = np.histogram(overrunHours, bins=OVERRUN_BINS_HOURS)
+        return [
+            (OVERRUN_BINS_HOURS[i], OVERRUN_BINS_HOURS[i + 1], int(counts[i]))
+            for i in range(len(counts))
+        ]
+
+    # --- output related ------------------------------------------------
+
+    def print_rollup(self, dimension: str, out=None):
+        print("By " + dimension + ":", file=out)
+        print(
+            ROLLUP_HEADER_FORMAT.format(
+                "",
+                "issues",
+                "estim",
+                "original",
+                "total",
+                "spent",
+                "left",
+                "overrun",
+                "ratio",
+            ),
+            file=out,
+        )
+        for row in self.rollup(dimension):
+            print(
+                ROLLUP_ROW_FORMAT.format(
+                    row[0],
+                    row[1],
+                    row[2],
+                    row[3] / 3600,
+                    row[4] / 3600,
+                    row[5] / 3600,
+                    row[6] / 3600,
+                    row[7],
+                    row[8],
+                ),
+                file=out,
+            )
+        print("", file=out)
+
+    def print_overrun_distribution(self, out=None):
+        print("Time over original estimation:", file=out)
+        for fromHours, toHours, issues in self.overrun_distribution():
+            label = "{:g}h-{:g}h".format(fromHours, toHours)
+            if toHours == np.inf:
+                label = "> {:g}h".format(fromHours)
+            print(" {:<10} {:d}".format(label, issues), file=out)
+        print("", file=out)
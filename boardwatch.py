@@ -0,0 +1,196 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import NamedTuple
+
+from issuemodel import IssueRecord, SubtasksStats, epic_key
+
+DEFAULT_WATCH_INTERVAL_SECONDS = 60
+DEFAULT_METRICS_PORT = 9464
+DEFAULT_METRICS_HOST = "127.0.0.1"
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+NO_VALUE_LABEL = "None"
+
+# name: (help, value of a board issue)
+ISSUE_METRICS = {
+    "jira_board_issues": ("Board issues", lambda issue: 1),
+    "jira_board_estimated_issues": (
+        "Board issues with an original estimation",
+        lambda issue: int(issue.progress.original_estimate > 0),
+    ),
+    "jira_board_original_estimate_seconds": (
+        "Original estimation, sub-tasks included",
+        lambda issue: issue.progress.original_estimate,
+    ),
+    "jira_board_time_spent_seconds": (
+        "Time logged, sub-tasks included",
+        lambda issue: issue.progress.progress,
+    ),
+    "jira_board_time_left_seconds": (
+        "Remaining estimation, sub-tasks included",
+        lambda issue: issue.progress.time_left,
+    ),
+    "jira_board_overrun_issues": (
+        "Estimated issues with more time logged than estimated",
+        lambda issue: int(
+            issue.progress.original_estimate > 0
+            and issue.progress.time_left_original < 0
+        ),
+    ),
+    "jira_board_overrun_seconds": (
+        "Time logged over the original estimation",
+        lambda issue: max(0, -issue.progress.time_left_original),
+    ),
+    "jira_board_subtasks_not_estimated": (
+        "Open sub-tasks with no original estimation",
+        lambda issue: issue.subtasks_wo_estimation,
+    ),
+}
+METRIC_LABELS = ["status", "type", "assignee", "epic"]
+
+
+class WatchedIssue(NamedTuple):
+    """What the metrics need of a board issue"""
+
+    updated: str
+    labels: tuple
+    # the aggregated numbers for stories
+    progress: object
+    subtasks_wo_estimation: int
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# ==============================================================================
+class BoardState:
+    """Parsed board issues kept in memory by the watch mode, rendered as
+    Prometheus metrics after every refresh"""
+
+    def __init__(self, epicField: str = "parent"):
+        self.epic_field = epicField
+        self.issues = {}
+        self.lock = threading.Lock()
+        # refresh statistics, exposed as jira_watch_* metrics
+        self.stats = {
+            "refreshes_full": 0,
+            "refreshes_incremental": 0,
+            "refresh_errors": 0,
+            "changed_issues": 0,
+            "last_refresh_timestamp": 0.0,
+            "last_refresh_seconds": 0.0,
+        }
+        self.metrics = ""
+
+    def fields(self) -> list:
+        """Issue fields needed on top of the parsed ones"""
+        return ["updated", "assignee", self.epic_field]
+
+    def keys(self) -> set:
+        return set(self.issues)
+
+    def put(
+        self, issue: IssueRecord, issueJson: dict, subtasksStats: SubtasksStats
+    ) -> bool:
+        """Store the analysis of an issue, returns False if it has not changed"""
+        fields = issueJson["fields"]
+        assignee = fields.get("assignee") or {}
+        watched = WatchedIssue(
+            updated=fields.get("updated"),
+            labels=(
+                issue.status,
+                issue.original_type_name,
+                assignee.get("displayName") or NO_VALUE_LABEL,
+                epic_key(fields, self.epic_field) or NO_VALUE_LABEL,
+            ),
+            progress=issue.aggregate_progress if issue.has_subtasks else issue.progress,
+            subtasks_wo_estimation=subtasksStats.wo_estimation_count,
+        )
+        if self.issues.get(issue.key) == watched:
+            return False
+        self.issues[issue.key] = watched
+        return True
+
+    def remove(self, keys: list):
+        for key in keys:
+            self.issues.pop(key, None)
+
+    def render_metrics(self):
+        """Prometheus text exposition of the current state, served until the
+        next refresh"""
+        groups = {}
+        for issue in self.issues.values():
+            values = groups.setdefault(issue.labels, dict.fromkeys(ISSUE_METRICS, 0))
+            for name, (_, value) in ISSUE_METRICS.items():
+                values[name] += value(issue)
+
+        lines = []
+        for name, (help, _) in ISSUE_METRICS.items():
+            lines.append("# HELP " + name + " " + help)
+            lines.append("# TYPE " + name + " gauge")
+            for labels, values in sorted(groups.items()):
+                lines.append(
+                    name
+                    + "{"
+                    + ",".join(
+                        label + '="' + escape_label(value) + '"'
+                        for label, value in zip(METRIC_LABELS, labels)
+                    )
+                    + "} "
+                    + str(values[name])
+                )
+
+        stats = self.stats
+        lines += [
+            "# HELP jira_watch_refreshes_total Board refreshes",
+            "# TYPE jira_watch_refreshes_total counter",
+            'jira_watch_refreshes_total{kind="full"} ' + str(stats["refreshes_full"]),
+            'jira_watch_refreshes_total{kind="incremental"} '
+            + str(stats["refreshes_incremental"]),
+            "# HELP jira_watch_refresh_errors_total Failed board refreshes",
+            "# TYPE jira_watch_refresh_errors_total counter",
+            "jira_watch_refresh_errors_total " + str(stats["refresh_errors"]),
+            "# HELP jira_watch_changed_issues_total Issues re-analysed after a change",
+            "# TYPE jira_watch_changed_issues_total counter",
+            "jira_watch_changed_issues_total " + str(stats["changed_issues"]),
+            "# HELP jira_watch_last_refresh_timestamp_seconds End of the last refresh",
+            "# TYPE jira_watch_last_refresh_timestamp_seconds gauge",
+            "jira_watch_last_refresh_timestamp_seconds "
+            + "{:.3f}".format(stats["last_refresh_timestamp"]),
+            "# HELP jira_watch_last_refresh_duration_seconds Last refresh duration",
+            "# TYPE jira_watch_last_refresh_duration_seconds gauge",
+            "jira_watch_last_refresh_duration_seconds "
+            + "{:.3f}".format(stats["last_refresh_seconds"]),
+        ]
+
+        with self.lock:
+            self.metrics = "\n".join(lines) + "\n"
+
+    def serve_metrics(
+        self, port: int = DEFAULT_METRICS_PORT, host: str = DEFAULT_METRICS_HOST
+    ) -> ThreadingHTTPServer:
+        """Serve the last rendered metrics on http://host:port/metrics from a
+        background thread"""
+        boardState = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                with boardState.lock:
+                    data = boardState.metrics.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", METRICS_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
@@ -0,0 +1,65 @@
+import math
+from datetime import date, datetime, timedelta
+
+from issuemodel import IssueRecord, hours
+
+DEFAULT_BURNDOWN_DAYS = 14
+BURNDOWN_ROW_FORMAT = " {}  logged {:>6.1f}h  left {:>7.1f}h"
+
+
+# ==============================================================================
+class Burndown:
+    """Daily logged time and time left of issues with their sub-tasks, out of
+    synced worklogs. Time left at the end of a past day is the current time
+    left plus the time logged after that day, as if estimations had not
+    changed since."""
+
+    def __init__(self, days: int = DEFAULT_BURNDOWN_DAYS):
+        self.days = max(1, days)
+        self.issue_ids = set()
+        # seconds, stories by their aggregated numbers
+        self.time_left = 0
+
+    def add(self, issue: IssueRecord, issueJson: dict, subtasks: dict):
+        self.issue_ids.add(issueJson["id"])
+        self.issue_ids.update(subtask["id"] for subtask in subtasks.values())
+        progress = issue.aggregate_progress if issue.has_subtasks else issue.progress
+        self.time_left += max(0, progress.time_left)
+
+    def print_report(self, worklogStore, title: str = "Burndown", out=None):
+        today = date.today()
+        days = [today - timedelta(days=i) for i in reversed(range(self.days))]
+        daily = worklogStore.daily_seconds(
+            self.issue_ids, datetime.combine(days[0], datetime.min.time()).timestamp()
+        )
+        logged = [daily.get(day.isoformat(), 0) for day in days]
+
+        print("", file=out)
+        print(title + ", last " + str(self.days) + " days:", file=out)
+        loggedAfter = sum(logged)
+        for day, dayLogged in zip(days, logged):
+            loggedAfter -= dayLogged
+            print(
+                BURNDOWN_ROW_FORMAT.format(
+                    day.isoformat(),
+                    dayLogged / 3600,
+                    (self.time_left + loggedAfter) / 3600,
+                ),
+                file=out,
+            )
+
+        burnRate = sum(logged) / self.days
+        if burnRate == 0:
+            print(" No time logged, no forecast", file=out)
+            return
+        print(" Burn rate = " + hours(burnRate, 1) + "h per day", file=out)
+        if self.time_left == 0:
+            print(" No time left", file=out)
+            return
+        daysLeft = math.ceil(self.time_left / burnRate)
+        print(
+            " Time left reaches zero in ~{:d} days, on {}".format(
+                daysLeft, (today + timedelta(days=daysLeft)).isoformat()
+            ),
+            file=out,
+        )
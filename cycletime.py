@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+
+import configparser
+import sys
+from fetchengine import FetchEngine
+from flowstats import DEFAULT_FLOW_DAYS, FlowStats
+from issuecache import IssueCache
+from jiraclient import JiraClient
+from profiler import PROFILER
+from jiraparser import JiraJSONParser
+
+""" Lead time, cycle time and time spent per status of a board issues out of their status changelog, fetched in bulk with the board search """
+
+# read config
+config = configparser.ConfigParser()
+config.read("config.ini")
+
+# --profile prints time spent per phase at exit, --trace FILE records it
+PROFILER.configure(sys.argv[1:])
+
+# the board issues, done ones included if done recently
+flow_days = config["default"].getint("flowDays", DEFAULT_FLOW_DAYS)
+board_query = {
+    "projectId": config["default"]["issueKey"],
+    "taskTypes": ["Story", "Task"],
+    "excludeDone": False,
+    "excludeOpen": False,
+    "resolvedWithinDays": flow_days,
+}
+# if there is a Board in config (filterId) ->
+if "filterId" in config["default"]:
+    board_query["filter"] = int(config["default"]["filterId"])
+jsql_query = JiraJSONParser.form_jql_query(**board_query)
+
+auth_token = config["default"]["authentication-token"]
+jira_base_api_url = config["default"]["jiraURL"] + "/rest/api/2/issue/"
+fetch_engine = FetchEngine.from_config(config["default"])
+jira_client = JiraClient.from_config(config["default"])
+# changelogs of unchanged issues are taken from the cache
+issue_cache = IssueCache.from_config(config["default"])
+
+board_fetcher = JiraJSONParser(
+    auth_token, jira_base_api_url, fetch_engine, jira_client, issue_cache
+)
+flow_stats = FlowStats(board_fetcher.get_statuses())
+for page in board_fetcher.search_changelogs(jsql_query, FlowStats.fields()):
+    with PROFILER.phase("flow"):
+        for issue in page["issues"]:
+            flow_stats.add(issue)
+
+with PROFILER.phase("render"):
+    flow_stats.print_report(flow_days)
+
+fetch_engine.close()
+jira_client.close()
+if issue_cache is not None:
+    issue_cache.close()
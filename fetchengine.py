@@ -0,0 +1,74 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, NamedTuple
+
+DEFAULT_CONCURRENCY = 8
+
+
+class FetchResult(NamedTuple):
+    """Outcome of a single fetch job: either a value or the raised error"""
+
+    item: Any
+    value: Any = None
+    error: Exception = None
+
+
+# ==============================================================================
+class FetchEngine:
+    """Runs fetch jobs on a bounded thread pool, delivering results in the
+    order the jobs were submitted"""
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY):
+        self.concurrency = max(1, concurrency)
+        self.executor = None
+        if self.concurrency > 1:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.concurrency, thread_name_prefix="jira-fetch"
+            )
+
+    @staticmethod
+    def from_config(config) -> "FetchEngine":
+        """Engine running as many jobs at once as set by a config section"""
+        return FetchEngine(config.getint("concurrency", DEFAULT_CONCURRENCY))
+
+    def submit(self, fn: Callable, *args) -> Future:
+        # no pool for a single "thread" - run in place
+        if self.executor is None:
+            future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as error:
+                future.set_exception(error)
+            return future
+
+        return self.executor.submit(fn, *args)
+
+    def map(self, fn: Callable, items: Iterable) -> Iterator[FetchResult]:
+        """Run fn for every item and yield results in items order. At most
+        2 x concurrency jobs are in flight, so long inputs keep memory bounded.
+        Jobs must not submit work to the same engine and wait for it."""
+        pending = deque()
+        for item in items:
+            pending.append((item, self.submit(fn, item)))
+            if len(pending) >= self.concurrency * 2:
+                yield self._result(*pending.popleft())
+
+        while pending:
+            yield self._result(*pending.popleft())
+
+    @staticmethod
+    def _result(item: Any, future: Future) -> FetchResult:
+        try:
+            return FetchResult(item, future.result())
+        except Exception as error:
+            return FetchResult(item, error=error)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
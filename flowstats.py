@@ -0,0 +1,164 @@
+from datetime import datetime
+from typing import NamedTuple
+
+from profiler import Profiler
+
+DEFAULT_FLOW_DAYS = 90
+FLOW_HEADER_FORMAT = "{:<24} {:>6} {:>7} {:>7} {:>7} {:>7} {:>7} {:>6}"
+FLOW_ROW_FORMAT = "{:<24.24} {:>6d} {:>7.1f} {:>7.1f} {:>7.1f} {:>7.1f} {:>7.1f} {:>6}"
+# rows of the status dwell table go in the workflow order
+CATEGORY_ORDER = ["new", "indeterminate", "done"]
+# statuses deleted since are treated as work in progress
+UNKNOWN_CATEGORY = "indeterminate"
+DAY_SECONDS = 24 * 3600
+
+
+def jira_timestamp(value: str) -> float:
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%f%z").timestamp()
+
+
+class IssueFlow(NamedTuple):
+    """Status history of an issue, times are Unix timestamps"""
+
+    key: str
+    created: float
+    resolved: float
+    status: str
+    # (changed at, from status id, to status id) in time order
+    transitions: tuple
+
+    @staticmethod
+    def from_json(issueJson: dict, statusNames: dict) -> "IssueFlow":
+        """Issue JSON expanded with the changelog, status names found in the
+        changelog are added to statusNames"""
+        fields = issueJson["fields"]
+        statusNames.setdefault(fields["status"]["id"], fields["status"]["name"])
+        transitions = []
+        for history in issueJson["changelog"]["histories"]:
+            changedAt = jira_timestamp(history["created"])
+            for item in history["items"]:
+                if item["field"] != "status":
+                    continue
+                statusNames.setdefault(item["from"], item["fromString"])
+                statusNames.setdefault(item["to"], item["toString"])
+                transitions.append((changedAt, item["from"], item["to"]))
+        transitions.sort(key=lambda transition: transition[0])
+
+        return IssueFlow(
+            key=issueJson["key"],
+            created=jira_timestamp(fields["created"]),
+            resolved=(
+                jira_timestamp(fields["resolutiondate"])
+                if fields.get("resolutiondate")
+                else None
+            ),
+            status=fields["status"]["id"],
+            transitions=tuple(transitions),
+        )
+
+
+# ==============================================================================
+class FlowStats:
+    """Lead time (created - done), cycle time (first work in progress status -
+    done) and time spent per status of board issues out of their status
+    transitions"""
+
+    def __init__(self, statuses: dict):
+        # status id: status category key
+        self.categories = {
+            statusId: category for statusId, (_, category) in statuses.items()
+        }
+        self.names = {statusId: name for statusId, (name, _) in statuses.items()}
+        self.issues_count = 0
+        # seconds per done issue
+        self.lead_times = []
+        self.cycle_times = []
+        # status id: [seconds spent by an issue which has left the status]
+        self.dwell_times = {}
+        # status id: issues in the status now
+        self.current = {}
+
+    @staticmethod
+    def fields() -> list:
+        return ["created", "resolutiondate", "status"]
+
+    def category(self, statusId: str) -> str:
+        return self.categories.get(statusId, UNKNOWN_CATEGORY)
+
+    def add(self, issueJson: dict):
+        flow = IssueFlow.from_json(issueJson, self.names)
+        self.issues_count += 1
+        self.current[flow.status] = self.current.get(flow.status, 0) + 1
+
+        # stays in statuses, revisits of a status add up
+        dwell = {}
+        enteredAt = flow.created
+        startedAt = None
+        doneAt = None
+        for changedAt, fromStatus, toStatus in flow.transitions:
+            dwell[fromStatus] = dwell.get(fromStatus, 0) + changedAt - enteredAt
+            enteredAt = changedAt
+            if startedAt is None and self.category(toStatus) == "indeterminate":
+                startedAt = changedAt
+            if self.category(toStatus) == "done":
+                doneAt = changedAt
+        for statusId, seconds in dwell.items():
+            if self.category(statusId) != "done":
+                self.dwell_times.setdefault(statusId, []).append(seconds)
+
+        if self.category(flow.status) != "done":
+            return
+        doneAt = flow.resolved or doneAt or enteredAt
+        self.lead_times.append(doneAt - flow.created)
+        # issues done right away have no cycle time
+        if startedAt is not None and startedAt <= doneAt:
+            self.cycle_times.append(doneAt - startedAt)
+
+    def status_order(self, statusId: str) -> tuple:
+        category = self.category(statusId)
+        return CATEGORY_ORDER.index(category), self.names.get(statusId, statusId)
+
+    @staticmethod
+    def print_row(title: str, seconds: list, current=""):
+        if len(seconds) == 0:
+            print(FLOW_HEADER_FORMAT.format(title, 0, "", "", "", "", "", current))
+            return
+        seconds = sorted(seconds)
+        print(
+            FLOW_ROW_FORMAT.format(
+                title,
+                len(seconds),
+                sum(seconds) / len(seconds) / DAY_SECONDS,
+                Profiler.percentile(seconds, 0.5) / DAY_SECONDS,
+                Profiler.percentile(seconds, 0.85) / DAY_SECONDS,
+                Profiler.percentile(seconds, 0.95) / DAY_SECONDS,
+                seconds[-1] / DAY_SECONDS,
+                current,
+            )
+        )
+
+    def print_report(self, doneWithinDays: int = DEFAULT_FLOW_DAYS):
+        print(
+            "Flow of {:d} issues, {:d} done within the last {:d} days".format(
+                self.issues_count, len(self.lead_times), doneWithinDays
+            )
+        )
+        print(
+            FLOW_HEADER_FORMAT.format(
+                "", "issues", "mean d", "p50 d", "p85 d", "p95 d", "max d", "now"
+            )
+        )
+        FlowStats.print_row("Lead time", self.lead_times)
+        FlowStats.print_row("Cycle time", self.cycle_times)
+
+        print("")
+        print("Time in status:")
+        statusIds = set(self.dwell_times) | {
+            statusId for statusId in self.current if self.category(statusId) != "done"
+        }
+        for statusId in sorted(statusIds, key=self.status_order):
+            FlowStats.print_row(
+                self.names.get(statusId, statusId),
+                self.dwell_times.get(statusId, []),
+                str(self.current.get(statusId, 0)),
+            )
@@ -0,0 +1,234 @@
+from typing import NamedTuple
+
+from issuemodel import epic_key
+
+# fields the index reads on top of the epic field
+HIERARCHY_FIELDS = ["parent", "issuetype", "status", "timetracking"]
+
+
+class Rollup(NamedTuple):
+    """Numbers of an issue together with all its descendants, times in seconds"""
+
+    issues: int = 0
+    original_estimate: int = 0
+    spent: int = 0
+    time_left: int = 0
+    # leaf issues (no children) with no original estimation
+    wo_estimation_count: int = 0
+    # how many of them are not done yet
+    wo_estimation_open: int = 0
+    # their keys, attached once the numbers are summed up
+    wo_estimation: tuple = ()
+
+
+class HierarchyNode(NamedTuple):
+    parent: str
+    type_name: str
+    is_subtask: bool
+    own: Rollup
+    # aggregated original estimation according to Jira, None if not fetched
+    jira_aggregate_estimate: int = None
+
+
+# ==============================================================================
+class HierarchyIndex:
+    """Epic -> story -> sub-task tree of fetched issues. Rollups are computed
+    bottom-up in a single pass over all the issues."""
+
+    def __init__(self, epicField: str = "parent"):
+        self.epic_field = epicField
+        self.nodes = {}
+
+    def fields(self) -> list:
+        return HIERARCHY_FIELDS + [self.epic_field]
+
+    @staticmethod
+    def children_jql(epicField: str, epicKey: str) -> str:
+        """JQL for the issues of an epic, linked by parent or an epic link field"""
+        if epicField.startswith("customfield_"):
+            return "cf[" + epicField[len("customfield_") :] + "] = " + epicKey
+        return epicField + " = " + epicKey
+
+    def add(self, issueJson: dict):
+        fields = issueJson["fields"]
+        timetracking = fields.get("timetracking") or {}
+        isSubtask = bool(fields["issuetype"].get("subtask"))
+
+        # sub-tasks hang on their parent, other issues on their epic
+        parent = epic_key(fields, "parent" if isSubtask else self.epic_field)
+
+        jiraAggregateEstimate = None
+        if "aggregatetimeoriginalestimate" in fields:
+            jiraAggregateEstimate = fields["aggregatetimeoriginalestimate"] or 0
+
+        estimated = "originalEstimate" in timetracking
+        self.nodes[issueJson["key"]] = HierarchyNode(
+            parent=parent,
+            type_name=fields["issuetype"]["name"],
+            is_subtask=isSubtask,
+            own=Rollup(
+                issues=1,
+                original_estimate=timetracking.get("originalEstimateSeconds", 0),
+                spent=timetracking.get("timeSpentSeconds", 0),
+                time_left=timetracking.get("remainingEstimateSeconds", 0),
+                wo_estimation_count=int(not estimated),
+                wo_estimation_open=int(
+                    not estimated and fields["status"]["name"] != "Done"
+                ),
+            ),
+            jira_aggregate_estimate=jiraAggregateEstimate,
+        )
+
+    def rollup(self) -> dict:
+        """{issue key: Rollup} for the fetched issues and the epics they refer to
+        (epics which were not fetched themselves have no own numbers)"""
+        depths = {}
+        for key in self.nodes:
+            self._depth(key, depths)
+
+        hasChildren = {
+            node.parent for node in self.nodes.values() if node.parent is not None
+        }
+        levels = {}
+        for key, depth in depths.items():
+            levels.setdefault(depth, []).append(key)
+
+        rollups = {}
+        # deepest issues first, so every issue is complete before its parent
+        for key in (
+            key for depth in sorted(levels, reverse=True) for key in levels[depth]
+        ):
+            own = Rollup()
+            if key in self.nodes:
+                own = self.nodes[key].own
+                # missing estimations are counted on leaves only
+                if key in hasChildren:
+                    own = own._replace(wo_estimation_count=0, wo_estimation_open=0)
+            rollup = HierarchyIndex._sum(rollups.get(key, Rollup()), own)
+            rollups[key] = rollup
+
+            parent = self.nodes[key].parent if key in self.nodes else None
+            if parent is not None:
+                rollups[parent] = HierarchyIndex._sum(
+                    rollups.get(parent, Rollup()), rollup
+                )
+
+        # keys of not estimated leaves go to their ancestors in a separate pass,
+        # appended to a list per issue instead of joined level by level
+        woEstimation = {}
+        for key, node in self.nodes.items():
+            if key in hasChildren or node.own.wo_estimation_count == 0:
+                continue
+            ancestor = key
+            while True:
+                woEstimation.setdefault(ancestor, []).append(key)
+                if depths[ancestor] == 0:
+                    break
+                ancestor = self.nodes[ancestor].parent
+        for key, keys in woEstimation.items():
+            rollups[key] = rollups[key]._replace(wo_estimation=tuple(keys))
+
+        return rollups
+
+    def _depth(self, key: str, depths: dict) -> int:
+        # iterative walk up to the first issue with a known depth
+        path = []
+        while key not in depths:
+            path.append(key)
+            node = self.nodes.get(key)
+            if node is None or node.parent is None or node.parent in path:
+                depths[key] = 0
+                path.pop()
+                break
+            key = node.parent
+        depth = depths[key]
+        for key in reversed(path):
+            depth += 1
+            depths[key] = depth
+        return depth
+
+    @staticmethod
+    def _sum(a: Rollup, b: Rollup) -> Rollup:
+        return Rollup(
+            a.issues + b.issues,
+            a.original_estimate + b.original_estimate,
+            a.spent + b.spent,
+            a.time_left + b.time_left,
+            a.wo_estimation_count + b.wo_estimation_count,
+            a.wo_estimation_open + b.wo_estimation_open,
+        )
+
+    def epics(self) -> list:
+        """Keys of epics: top level issues having children"""
+        epics = set()
+        for node in self.nodes.values():
+            if node.parent is not None and not node.is_subtask:
+                epics.add(node.parent)
+        return sorted(epics)
+
+    def without_epic(self, rollups: dict) -> Rollup:
+        """Sum of top level issues which are not in any epic"""
+        epics = set(self.epics())
+        total = Rollup()
+        woEstimation = []
+        for key, node in self.nodes.items():
+            if node.parent is None and key not in epics:
+                total = HierarchyIndex._sum(total, rollups[key])
+                woEstimation.extend(rollups[key].wo_estimation)
+        return total._replace(wo_estimation=tuple(woEstimation))
+
+    def mismatches(self, rollups: dict) -> list:
+        """Keys of issues whose aggregated original estimation in Jira differs
+        from the one computed out of the fetched sub-tasks. Jira aggregates
+        sub-tasks only, so issues having other children (epics) are skipped."""
+        withOtherChildren = {
+            node.parent for node in self.nodes.values() if not node.is_subtask
+        }
+        return [
+            key
+            for key, node in self.nodes.items()
+            if node.jira_aggregate_estimate is not None
+            and key not in withOtherChildren
+            and node.jira_aggregate_estimate != rollups[key].original_estimate
+        ]
+
+    # --- output related ------------------------------------------------
+
+    @staticmethod
+    def print_rollup(title: str, rollup: Rollup, out=None):
+        print(
+            "{}: issues {:d}, e{:.1f}h, spent {:.1f}h, left {:.1f}h".format(
+                title,
+                rollup.issues,
+                rollup.original_estimate / 3600,
+                rollup.spent / 3600,
+                rollup.time_left / 3600,
+            ),
+            file=out,
+        )
+        if rollup.wo_estimation_count > 0:
+            print(
+                " Not estimated ({:d} open): {}".format(
+                    rollup.wo_estimation_open, ",".join(rollup.wo_estimation)
+                ),
+                file=out,
+            )
+
+    def print_epics(self, rollups: dict, out=None):
+        print("Epics:", file=out)
+        for key in self.epics():
+            HierarchyIndex.print_rollup(key, rollups[key], out)
+        withoutEpic = self.without_epic(rollups)
+        if withoutEpic.issues > 0:
+            HierarchyIndex.print_rollup("No epic", withoutEpic, out)
+        print("", file=out)
+
+    def print_mismatches(self, rollups: dict, out=None):
+        mismatches = self.mismatches(rollups)
+        if len(mismatches) > 0:
+            print(
+                "Jira aggregated estimation differs from sub-tasks sum: "
+                + ",".join(mismatches),
+                file=out,
+            )
+            print("", file=out)
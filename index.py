@@ -2,40 +2,48 @@
 
 import configparser
 import sys
-from jiraparser import JiraJSONParser
+from queryclient import DEFAULT_SERVER_SOCKET, ask_server
 
-""" Getting a single issue defined by income argument and print analysis information """
+""" Getting issues defined by income arguments and print analysis information """
 
 # read config
 # TODO: make config file customized via arguments
 config = configparser.ConfigParser()
 config.read("config.ini")
 
-# getting issue key out of argument
-if len(sys.argv) < 2:
+# a running index server answers with its warm connections and cache,
+# profiling is done by the direct mode only
+arguments = sys.argv[1:]
+if len(arguments) > 0 and not any(
+    argument.startswith(("--profile", "--trace")) for argument in arguments
+):
+    answer = ask_server(
+        config["default"].get("serverSocket", DEFAULT_SERVER_SOCKET), arguments
+    )
+    if answer is not None:
+        sys.stdout.write(answer[1])
+        exit(answer[0])
+
+from issuereport import IssueReport
+from profiler import PROFILER
+
+# getting issue key out of argument, --profile prints time spent per phase
+# at exit, --trace FILE records it
+issue_keys = PROFILER.configure(arguments)
+if len(issue_keys) == 0:
     print("\033[91mWarning\033[0m: missing issue key")
     print(
         "Please use issue key for examination as incoming command line parameter. Example:"
     )
     print("> python index.py JIRA-15")
+    print("> python index.py JIRA-15 JIRA-16")
     exit(1)
 
-issue_key = sys.argv[1]
-auth_token = config["default"]["authentication-token"]
-jira_base_api_url = config["default"]["jiraURL"] + "/rest/api/2/issue/"
-
-# action: get a single issue
-issue_parser = JiraJSONParser(auth_token, jira_base_api_url)
-issue_parser.get_and_parse(issue_key)
-
-# general information
-issue_parser.print_general_info()
-
-# story progress info
-issue_parser.print_progress_info()
-
-# subtasks info
-issue_parser.get_parse_subtasks()
-issue_parser.print_subtasks_stats()
+issue_report = IssueReport(config["default"])
+all_printed = issue_report.print_report(issue_keys)
+issue_report.close()
+# failed issues fail the run, as cron jobs expect
+if not all_printed:
+    exit(1)
 
 # TODO: print tasks WO estimation and their status
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+import configparser
+import io
+import json
+import os
+import socket
+import socketserver
+import time
+from contextlib import redirect_stdout
+from issuereport import IssueReport
+from jiraparser import RED_COLOR, ENDTERM
+from queryclient import DEFAULT_SERVER_SOCKET
+
+""" Index server: keeps the Jira session pool, issue cache and recently fetched issues warm and prints index.py analysis for the clients connecting to its Unix socket """
+
+DEFAULT_SERVER_MAX_AGE_SECONDS = 60
+
+# read config
+config = configparser.ConfigParser()
+config.read("config.ini")
+
+socket_path = os.path.abspath(
+    config["default"].get("serverSocket", DEFAULT_SERVER_SOCKET)
+)
+issue_report = IssueReport(
+    config["default"],
+    config["default"].getint("serverMaxAgeSeconds", DEFAULT_SERVER_MAX_AGE_SECONDS),
+)
+
+
+def answer(issue_keys: list) -> tuple:
+    """(exit code, output) of index.py for the issue keys"""
+    output = io.StringIO()
+    status = 0
+    with redirect_stdout(output):
+        if len(issue_keys) == 0:
+            print(RED_COLOR + "Warning" + ENDTERM + ": missing issue key")
+            status = 1
+        else:
+            try:
+                if not issue_report.print_report(issue_keys):
+                    status = 1
+            except Exception as error:
+                print(RED_COLOR + "Warning" + ENDTERM + ": " + str(error))
+                status = 1
+    return status, output.getvalue()
+
+
+class IndexRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        started_at = time.perf_counter()
+        line = self.rfile.readline()
+        # a server starting on the same socket checks whether this one is up
+        if not line:
+            return
+        issue_keys = json.loads(line)["args"]
+        status, output = answer(issue_keys)
+        data = output.encode("utf-8")
+        # the length tells the client whether it got the whole answer
+        header = {"status": status, "length": len(data)}
+        self.wfile.write(json.dumps(header).encode("utf-8") + b"\n")
+        self.wfile.write(data)
+        print(
+            "{}: {:.3f}s".format(
+                " ".join(issue_keys), time.perf_counter() - started_at
+            ),
+            flush=True,
+        )
+
+
+if os.path.exists(socket_path):
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+        print(RED_COLOR + "Warning" + ENDTERM + ": a server listens on " + socket_path)
+        exit(1)
+    except OSError:
+        # left by a server which has not stopped cleanly
+        os.remove(socket_path)
+    finally:
+        probe.close()
+
+# requests are answered one by one, the fetching of each is parallel
+server = socketserver.UnixStreamServer(socket_path, IndexRequestHandler)
+print("Serving index.py on " + socket_path, flush=True)
+try:
+    server.serve_forever()
+except KeyboardInterrupt:
+    pass
+finally:
+    server.server_close()
+    os.remove(socket_path)
+    issue_report.close()
@@ -0,0 +1,198 @@
+import gzip
+import json
+import os
+import zlib
+from collections import OrderedDict
+
+from issuemodel import epic_key
+
+# issues per gzip member, the unit of decompression when reading
+DEFAULT_BLOCK_ISSUES = 256
+# decompressed blocks kept in memory by a reader
+CACHED_BLOCKS = 4
+# 2: issue ids are kept, worklogs refer to issues by id
+ARCHIVE_VERSION = 2
+
+
+def index_path(path: str) -> str:
+    return path + ".index"
+
+
+def issue_parents(issueJson: dict, epicField: str) -> list:
+    """Keys of the parent and the epic of an issue"""
+    parents = []
+    for field in ["parent", epicField]:
+        value = epic_key(issueJson["fields"], field)
+        if value and value not in parents:
+            parents.append(value)
+    return parents
+
+
+# ==============================================================================
+class IssueArchiveWriter:
+    """Writes fetched issues and their sub-tasks to a compressed NDJSON file
+    for offline analysis. Every block of lines is a separate gzip member, so
+    the file is a plain .gz for other tools, and the offsets of the blocks are
+    written to a JSON index next to it."""
+
+    def __init__(
+        self,
+        path: str,
+        epicField: str = "parent",
+        blockIssues: int = DEFAULT_BLOCK_ISSUES,
+    ):
+        self.path = path
+        self.epic_field = epicField
+        self.block_issues = blockIssues
+        # written next to the final files, renamed once complete
+        self.file = open(path + ".tmp", "wb")
+        self.block = []
+        # key: [block offset, block length, line, parents]
+        self.entries = {}
+        # keys of analysed issues in the analysis order (dict as an ordered set)
+        self.listed = {}
+        self.pending = {}
+        # stored with the sub-task fields only, stored again if analysed
+        self.subtask_keys = set()
+
+    @staticmethod
+    def from_config(config, epicField: str = "parent") -> "IssueArchiveWriter":
+        """Writer defined by a config section, None if export is not turned on"""
+        if "exportFile" not in config:
+            return None
+        return IssueArchiveWriter(config["exportFile"], epicField)
+
+    def put(self, issueJson: dict, subtasks: dict = {}, listed: bool = True):
+        """Store an issue with its sub-tasks, listed issues are the ones
+        offline runs analyse"""
+        if listed:
+            self.listed[issueJson["key"]] = None
+        for issue in [issueJson] + list(subtasks.values()):
+            if issue["key"] in self.entries or issue["key"] in self.pending:
+                if issue is not issueJson or issue["key"] not in self.subtask_keys:
+                    continue
+            if issue is issueJson:
+                self.subtask_keys.discard(issue["key"])
+            else:
+                self.subtask_keys.add(issue["key"])
+            # sub-tasks hang on their parent only, which is what children() needs
+            parents = []
+            if not issue["fields"].get("issuetype", {}).get("subtask"):
+                parents = issue_parents(issue, self.epic_field)
+            self.pending[issue["key"]] = (len(self.block), parents)
+            self.block.append(
+                json.dumps(
+                    {"id": issue["id"], "key": issue["key"], "fields": issue["fields"]},
+                    separators=(",", ":"),
+                )
+            )
+            if len(self.block) >= self.block_issues:
+                self._flush()
+
+    def _flush(self):
+        if len(self.block) == 0:
+            return
+        data = gzip.compress(("\n".join(self.block) + "\n").encode("utf-8"))
+        offset = self.file.tell()
+        self.file.write(data)
+        for key, (line, parents) in self.pending.items():
+            self.entries[key] = [offset, len(data), line, parents]
+        self.block = []
+        self.pending = {}
+
+    def close(self):
+        self._flush()
+        self.file.close()
+        with open(index_path(self.path) + ".tmp", "w") as indexFile:
+            json.dump(
+                {
+                    "version": ARCHIVE_VERSION,
+                    "epicField": self.epic_field,
+                    "listed": list(self.listed),
+                    "issues": self.entries,
+                },
+                indexFile,
+                separators=(",", ":"),
+            )
+        os.replace(self.path + ".tmp", self.path)
+        os.replace(index_path(self.path) + ".tmp", index_path(self.path))
+
+
+# ==============================================================================
+class IssueArchive:
+    """Reads an archive written by IssueArchiveWriter. Only the index is loaded
+    up front, blocks are decompressed and issues decoded on access."""
+
+    def __init__(self, path: str):
+        # the index has a few numbers per issue, it is loaded as a whole
+        with open(index_path(path)) as indexFile:
+            index = json.load(indexFile)
+        if index.get("version") != ARCHIVE_VERSION:
+            raise ValueError(
+                "unsupported offline file version in " + path + ", export it again"
+            )
+        self.epic_field = index["epicField"]
+        self.listed = index["listed"]
+        self.entries = index["issues"]
+        self.file = open(path, "rb")
+        self.blocks = OrderedDict()
+        self.children_keys = None
+
+    @staticmethod
+    def from_config(config) -> "IssueArchive":
+        """Archive defined by a config section, None if offline mode is off"""
+        if "offlineFile" not in config:
+            return None
+        return IssueArchive(config["offlineFile"])
+
+    def count(self) -> int:
+        """Number of listed issues"""
+        return len(self.listed)
+
+    def get(self, key: str) -> dict:
+        """Issue JSON, None if it is not archived"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        lines = self._block(entry[0], entry[1])
+        return json.loads(lines[entry[2]])
+
+    def _block(self, offset: int, length: int) -> list:
+        # lines of the block, not decoded as JSON until an issue is needed
+        if offset in self.blocks:
+            self.blocks.move_to_end(offset)
+            return self.blocks[offset]
+        self.file.seek(offset)
+        data = zlib.decompress(self.file.read(length), wbits=31)
+        lines = data.decode("utf-8").split("\n")
+        self.blocks[offset] = lines
+        if len(self.blocks) > CACHED_BLOCKS:
+            self.blocks.popitem(last=False)
+        return lines
+
+    def subtasks(self, issueJson: dict) -> dict:
+        """{sub-task key: json} of the archived sub-tasks of an issue"""
+        subtasks = {}
+        for subtask in issueJson["fields"].get("subtasks", []):
+            subtaskJson = self.get(subtask["key"])
+            if subtaskJson is not None:
+                subtasks[subtask["key"]] = subtaskJson
+        return subtasks
+
+    def issues(self):
+        """Listed issues with their sub-tasks, in the order they were analysed"""
+        for key in self.listed:
+            issueJson = self.get(key)
+            yield issueJson, self.subtasks(issueJson)
+
+    def children(self, key: str) -> list:
+        """Archived non sub-task issues whose parent or epic is the given issue"""
+        if self.children_keys is None:
+            self.children_keys = {}
+            for childKey, entry in self.entries.items():
+                for parent in entry[3]:
+                    self.children_keys.setdefault(parent, []).append(childKey)
+        return [self.get(childKey) for childKey in self.children_keys.get(key, [])]
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,132 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+DEFAULT_CACHE_SIZE_MB = 200
+DEFAULT_CACHE_TTL_HOURS = 24 * 7
+
+
+# ==============================================================================
+class IssueCache:
+    """On-disk (SQLite) cache of issues JSON keyed by issue key + requested fields.
+    Every entry keeps the issue "updated" value so callers can revalidate it
+    with a cheap search; the cache is bounded by size (least recently used
+    entries go first) and by entries age."""
+
+    def __init__(
+        self,
+        path: str,
+        maxSizeMB: int = DEFAULT_CACHE_SIZE_MB,
+        ttlHours: int = DEFAULT_CACHE_TTL_HOURS,
+    ):
+        self.max_size = maxSizeMB * 1024 * 1024
+        self.ttl = ttlHours * 3600
+        self.lock = threading.Lock()
+        # shared by the fetch engine threads, guarded by the lock
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS issues ("
+            " key TEXT NOT NULL, fields TEXT NOT NULL, updated TEXT,"
+            " body BLOB NOT NULL, size INTEGER NOT NULL,"
+            " stored_at REAL NOT NULL, accessed_at REAL NOT NULL,"
+            " PRIMARY KEY (key, fields))"
+        )
+        self.db.execute(
+            "CREATE INDEX IF NOT EXISTS issues_accessed ON issues (accessed_at)"
+        )
+        self.size = self.db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM issues"
+        ).fetchone()[0]
+
+    @staticmethod
+    def from_config(config) -> "IssueCache":
+        """Cache defined by a config section, None if caching is not turned on"""
+        if "cacheFile" not in config:
+            return None
+        return IssueCache(
+            config["cacheFile"],
+            config.getint("cacheSizeMB", DEFAULT_CACHE_SIZE_MB),
+            config.getint("cacheTTLHours", DEFAULT_CACHE_TTL_HOURS),
+        )
+
+    @staticmethod
+    def fields_key(fields: list) -> str:
+        if not fields:
+            return "*all"
+        return ",".join(sorted(fields))
+
+    def get(self, issueKey: str, fields: list = None) -> dict:
+        """Cached issue JSON or None if it is missing or expired"""
+        fieldsKey = IssueCache.fields_key(fields)
+        now = time.time()
+        with self.lock:
+            row = self.db.execute(
+                "SELECT body, stored_at FROM issues WHERE key = ? AND fields = ?",
+                (issueKey, fieldsKey),
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] + self.ttl < now:
+                self._delete(issueKey, fieldsKey)
+                return None
+            self.db.execute(
+                "UPDATE issues SET accessed_at = ? WHERE key = ? AND fields = ?",
+                (now, issueKey, fieldsKey),
+            )
+
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, issueKey: str, fields: list, issueJson: dict):
+        fieldsKey = IssueCache.fields_key(fields)
+        body = zlib.compress(json.dumps(issueJson).encode("utf-8"))
+        updated = issueJson.get("fields", {}).get("updated")
+        now = time.time()
+        with self.lock:
+            self._delete(issueKey, fieldsKey)
+            self.db.execute(
+                "INSERT INTO issues VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (issueKey, fieldsKey, updated, body, len(body), now, now),
+            )
+            self.size += len(body)
+            if self.size > self.max_size:
+                self._evict()
+
+    def _delete(self, issueKey: str, fieldsKey: str):
+        row = self.db.execute(
+            "SELECT size FROM issues WHERE key = ? AND fields = ?",
+            (issueKey, fieldsKey),
+        ).fetchone()
+        if row is not None:
+            self.db.execute(
+                "DELETE FROM issues WHERE key = ? AND fields = ?",
+                (issueKey, fieldsKey),
+            )
+            self.size -= row[0]
+
+    def _evict(self):
+        # expired entries first, then least recently used ones down to 90% of
+        # the limit, so eviction does not run on every following insert
+        self.db.execute(
+            "DELETE FROM issues WHERE stored_at < ?", (time.time() - self.ttl,)
+        )
+        target = self.max_size * 0.9
+        self.size = self.db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM issues"
+        ).fetchone()[0]
+        for key, fieldsKey, size in self.db.execute(
+            "SELECT key, fields, size FROM issues ORDER BY accessed_at"
+        ).fetchall():
+            if self.size <= target:
+                break
+            self.db.execute(
+                "DELETE FROM issues WHERE key = ? AND fields = ?", (key, fieldsKey)
+            )
+            self.size -= size
+
+    def close(self):
+        with self.lock:
+            self.db.close()
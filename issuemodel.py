@@ -0,0 +1,142 @@
+from typing import NamedTuple
+
+
+def hours(seconds: float, digits: int = None) -> str:
+    """Seconds as hours with no unit, rounded to the digits if given"""
+    if digits is None:
+        return str(seconds / 3600)
+    return "{:.{}f}".format(seconds / 3600, digits)
+
+
+def epic_key(fields: dict, epicField: str) -> str:
+    """Key of the issue linked by the field, None if there is none"""
+    epic = fields.get(epicField)
+    # parent/issue link fields hold an issue, epic link fields its key
+    if isinstance(epic, dict):
+        epic = epic.get("key")
+    return epic or None
+
+
+class Progress(NamedTuple):
+    """Time tracking numbers of an issue, all the times are in seconds"""
+
+    original_estimate: int = 0
+    total: int = 0
+    progress: int = 0
+    percent: int = 0
+    time_left: int = 0
+    time_left_original: int = 0
+
+
+class IssueRecord(NamedTuple):
+    """Compact immutable result of parsing an issue JSON, the raw JSON is not
+    referenced so it can be released right after parsing"""
+
+    key: str
+    type_name: str
+    original_type_name: str
+    status: str
+    has_subtasks: bool
+    # (key, status name) pairs in the issue order
+    subtasks: tuple
+    progress: Progress
+    aggregate_progress: Progress
+
+    @staticmethod
+    def from_json(issueJson: dict) -> "IssueRecord":
+        fields = issueJson["fields"]
+        subtasks = tuple(
+            (subtask["key"], subtask["fields"]["status"]["name"])
+            for subtask in fields["subtasks"]
+        )
+        hasSubtasks = not bool(fields["issuetype"]["subtask"]) and len(subtasks) > 0
+
+        originalEstimate = 0
+        if (
+            "timetracking" in fields
+            and "originalEstimateSeconds" in fields["timetracking"]
+        ):
+            originalEstimate = fields["timetracking"]["originalEstimateSeconds"]
+        progress = fields["progress"]["progress"]
+        if not hasSubtasks and fields["progress"] and "total" in fields["progress"]:
+            originalEstimate = fields["progress"]["total"]
+
+        aggregateOriginalEstimate = 0
+        aggregateTotal = 0
+        aggregateProgress = 0
+        aggregatePercent = 0
+        if hasSubtasks and fields["aggregateprogress"]:
+            if fields["aggregatetimeoriginalestimate"]:
+                aggregateOriginalEstimate = fields["aggregatetimeoriginalestimate"]
+            aggregateTotal = fields["aggregateprogress"]["total"]
+            aggregateProgress = fields["aggregateprogress"]["progress"]
+            aggregatePercent = fields["aggregateprogress"].get("percent", 0)
+        if (
+            not hasSubtasks
+            and fields["aggregateprogress"]
+            and "total" in fields["aggregateprogress"]
+        ):
+            aggregateOriginalEstimate = fields["aggregateprogress"]["total"]
+            aggregateProgress = fields["aggregateprogress"]["progress"]
+
+        return IssueRecord(
+            key=issueJson["key"],
+            type_name="Story" if len(subtasks) > 0 else "Issue",
+            original_type_name=fields["issuetype"]["name"],
+            status=fields["status"]["name"],
+            has_subtasks=hasSubtasks,
+            subtasks=subtasks,
+            progress=Progress(
+                original_estimate=originalEstimate,
+                total=fields["progress"]["total"],
+                progress=progress,
+                percent=fields["progress"].get("percent", 0),
+                time_left=fields["timeestimate"] or 0,
+                time_left_original=IssueRecord.time_left(originalEstimate, progress),
+            ),
+            aggregate_progress=Progress(
+                original_estimate=aggregateOriginalEstimate,
+                total=aggregateTotal,
+                progress=aggregateProgress,
+                percent=aggregatePercent,
+                time_left=fields["aggregatetimeestimate"] or 0,
+                time_left_original=IssueRecord.time_left(
+                    aggregateOriginalEstimate, aggregateProgress
+                ),
+            ),
+        )
+
+    @staticmethod
+    def time_left(originalEstimate: int, progress: int) -> int:
+        """Time left according to the original estimation, 0 if not estimated"""
+        if originalEstimate > 0:
+            return originalEstimate - progress
+        return 0
+
+
+class SubtasksStats(NamedTuple):
+    """Estimations of an issue sub-tasks"""
+
+    # keys of sub-tasks with no original estimation
+    wo_estimation: tuple = ()
+    # how many of them are not done yet
+    wo_estimation_count: int = 0
+    # sum of sub-tasks original estimations, seconds
+    original_estimate: int = 0
+
+    @staticmethod
+    def from_json(issue: IssueRecord, subtasksJson: dict) -> "SubtasksStats":
+        """Stats of the issue sub-tasks, subtasksJson holds all of them by key"""
+        woEstimation = []
+        woEstimationCount = 0
+        originalEstimate = 0
+        for subtaskKey, subtaskStatus in issue.subtasks:
+            timetracking = subtasksJson[subtaskKey]["fields"]["timetracking"]
+            if "originalEstimate" not in timetracking:
+                woEstimation.append(subtaskKey)
+                if subtaskStatus != "Done":
+                    woEstimationCount += 1
+            elif "originalEstimateSeconds" in timetracking:
+                originalEstimate += timetracking["originalEstimateSeconds"]
+
+        return SubtasksStats(tuple(woEstimation), woEstimationCount, originalEstimate)
@@ -0,0 +1,245 @@
+import time
+
+import requests
+from burndown import DEFAULT_BURNDOWN_DAYS, Burndown
+from fetchengine import FetchEngine, FetchResult
+from hierarchy import HierarchyIndex
+from issuearchive import IssueArchive, IssueArchiveWriter
+from issuecache import IssueCache
+from jiraclient import JiraClient
+from jiraparser import JiraJSONParser, JiraRequestError, RED_COLOR, ENDTERM
+from profiler import PROFILER
+from worklogstore import WorklogStore
+
+
+# ==============================================================================
+class IssueReport:
+    """Analysis of single issues printed by index.py. Keeps the Jira session,
+    fetch engine and cache open between reports, so the index server can
+    answer many of them. Issues fetched within the last maxAgeSeconds are
+    reused without asking Jira."""
+
+    def __init__(self, config, maxAgeSeconds: int = 0):
+        self.config = config
+        self.max_age = maxAgeSeconds
+        # issue key: (fetched at, issue JSON, {sub-task key: json})
+        self.recent = {}
+
+        self.auth_token = config["authentication-token"]
+        self.jira_base_api_url = config["jiraURL"] + "/rest/api/2/issue/"
+        self.fetch_engine = FetchEngine.from_config(config)
+        self.jira_client = JiraClient.from_config(config)
+        self.issue_cache = IssueCache.from_config(config)
+        self.epic_field = config.get("epicLinkField", "parent")
+        self.issue_fields = JiraJSONParser.project_fields(
+            JiraJSONParser.fields_from_config(config),
+            HierarchyIndex(self.epic_field).fields(),
+        )
+        # offline analysis of exported issues
+        self.offline_archive = IssueArchive.from_config(config)
+        self.issue_archive = None
+        # burndown out of synced worklogs
+        self.worklog_store = WorklogStore.from_config(config)
+        self.burndown_days = config.getint("burndownDays", DEFAULT_BURNDOWN_DAYS)
+        self.issues_fetcher = self.new_parser()
+
+    def new_parser(self) -> JiraJSONParser:
+        return JiraJSONParser(
+            self.auth_token,
+            self.jira_base_api_url,
+            self.fetch_engine,
+            self.jira_client,
+            self.issue_cache,
+            self.issue_fields,
+        )
+
+    def get_offline(self, issueKey: str) -> FetchResult:
+        issueJson = self.offline_archive.get(issueKey)
+        if issueJson is None:
+            return FetchResult(
+                issueKey, error=LookupError(issueKey + " is not in the offline file")
+            )
+        return FetchResult(issueKey, issueJson)
+
+    def fetch(self, issueKeys: list) -> tuple:
+        """([FetchResult] of the issues, {issue key: {sub-task key: json}})"""
+        if self.offline_archive is not None:
+            fetchedIssues = [self.get_offline(issueKey) for issueKey in issueKeys]
+            return fetchedIssues, {
+                fetched.value["key"]: self.offline_archive.subtasks(fetched.value)
+                for fetched in fetchedIssues
+                if fetched.error is None
+            }
+
+        now = time.time()
+        # expired ones go, so the memo holds the issues of the last max age only
+        self.recent = {
+            issueKey: recent
+            for issueKey, recent in self.recent.items()
+            if recent[0] + self.max_age > now
+        }
+        recentKeys = [issueKey for issueKey in issueKeys if issueKey in self.recent]
+        PROFILER.count("recent issue hit", len(recentKeys))
+
+        # get the issues in parallel, then sub-tasks of all of them at once
+        fetched = {
+            result.item: result
+            for result in self.fetch_engine.map(
+                self.issues_fetcher.get_issue_json,
+                [issueKey for issueKey in issueKeys if issueKey not in recentKeys],
+            )
+        }
+        subtasks = self.issues_fetcher.fetch_subtasks(
+            [
+                result.value["key"]
+                for result in fetched.values()
+                if result.error is None and len(result.value["fields"]["subtasks"]) > 0
+            ]
+        )
+        if self.max_age > 0:
+            for result in fetched.values():
+                if result.error is None:
+                    self.recent[result.item] = (
+                        now,
+                        result.value,
+                        subtasks.get(result.value["key"], {}),
+                    )
+
+        for issueKey in recentKeys:
+            _, issueJson, issueSubtasks = self.recent[issueKey]
+            fetched[issueKey] = FetchResult(issueKey, issueJson)
+            subtasks[issueJson["key"]] = issueSubtasks
+        return [fetched[issueKey] for issueKey in issueKeys], subtasks
+
+    def print_hierarchy(self, issueJson: dict, subtasks: dict):
+        """Epic rollup out of the epic issues and their sub-tasks, fetched in
+        bulk, and a check of Jira aggregated estimations"""
+        hierarchy = HierarchyIndex(self.epic_field)
+        hierarchy.add(issueJson)
+        for subtask in subtasks.get(issueJson["key"], {}).values():
+            hierarchy.add(subtask)
+
+        isEpic = issueJson["fields"]["issuetype"]["name"] == "Epic"
+        if isEpic and self.offline_archive is not None:
+            children = self.offline_archive.children(issueJson["key"])
+            childrenSubtasks = {
+                child["key"]: self.offline_archive.subtasks(child) for child in children
+            }
+        elif isEpic:
+            children = list(
+                self.issues_fetcher.search_issues(
+                    HierarchyIndex.children_jql(self.epic_field, issueJson["key"]),
+                    parallel=True,
+                )
+            )
+            childrenSubtasks = self.issues_fetcher.fetch_subtasks(
+                [
+                    child["key"]
+                    for child in children
+                    if len(child["fields"]["subtasks"]) > 0
+                ]
+            )
+        if isEpic:
+            for child in children:
+                if self.issue_archive is not None:
+                    self.issue_archive.put(
+                        child, childrenSubtasks.get(child["key"], {}), listed=False
+                    )
+                hierarchy.add(child)
+                for subtask in childrenSubtasks.get(child["key"], {}).values():
+                    hierarchy.add(subtask)
+
+        rollups = hierarchy.rollup()
+        if isEpic:
+            print("")
+            HierarchyIndex.print_rollup("Epic rollup", rollups[issueJson["key"]])
+        mismatches = hierarchy.mismatches(rollups)
+        if len(mismatches) > 0:
+            print("")
+            print("Jira aggregated estimation differs from sub-tasks sum")
+
+    def sync_worklogs(self):
+        """New and edited worklogs, the stored ones are used if Jira fails"""
+        try:
+            with PROFILER.phase("worklogs sync"):
+                self.issues_fetcher.sync_worklogs(self.worklog_store)
+        except (JiraRequestError, requests.RequestException) as error:
+            print(RED_COLOR + "Warning" + ENDTERM + ": " + str(error))
+
+    def print_burndown(self, issue, issueJson: dict, subtasks: dict):
+        burndown = Burndown(self.burndown_days)
+        burndown.add(issue, issueJson, subtasks.get(issueJson["key"], {}))
+        burndown.print_report(self.worklog_store)
+
+    def print_report(self, issueKeys: list) -> bool:
+        """Print analysis of the issues, returns False if any of them could not
+        be fetched (Jira error or connection failure)"""
+        allPrinted = True
+        # export of the analysed issues
+        self.issue_archive = IssueArchiveWriter.from_config(
+            self.config, self.epic_field
+        )
+        fetchedIssues, issuesSubtasks = self.fetch(issueKeys)
+        if self.worklog_store is not None and self.offline_archive is None:
+            self.sync_worklogs()
+
+        for fetched in fetchedIssues:
+            if len(issueKeys) > 1:
+                print("Issue: " + fetched.item)
+
+            if fetched.error is not None:
+                print(RED_COLOR + "Warning" + ENDTERM + ": " + str(fetched.error))
+                print("")
+                allPrinted = False
+                continue
+
+            issueParser = self.new_parser()
+            issueParser.parse_issue_json(fetched.value)
+
+            with PROFILER.phase("render"):
+                # general information
+                issueParser.print_general_info()
+
+                # story progress info
+                issueParser.print_progress_info()
+
+            try:
+                # subtasks info, the ones fetched directly are exported too
+                issuesSubtasks[fetched.value["key"]] = issueParser.get_parse_subtasks(
+                    subtasks=issuesSubtasks
+                )
+                issueParser.print_subtasks_stats()
+                if self.issue_archive is not None:
+                    self.issue_archive.put(
+                        fetched.value, issuesSubtasks[fetched.value["key"]]
+                    )
+
+                # epic rollup
+                self.print_hierarchy(fetched.value, issuesSubtasks)
+            except (JiraRequestError, requests.RequestException) as error:
+                print(RED_COLOR + "Warning" + ENDTERM + ": " + str(error))
+                print("")
+                allPrinted = False
+                continue
+
+            # logged time per day and forecast
+            if self.worklog_store is not None:
+                self.print_burndown(issueParser.issue, fetched.value, issuesSubtasks)
+
+            if len(issueKeys) > 1:
+                print("")
+
+        if self.issue_archive is not None:
+            self.issue_archive.close()
+            self.issue_archive = None
+        return allPrinted
+
+    def close(self):
+        if self.offline_archive is not None:
+            self.offline_archive.close()
+        if self.worklog_store is not None:
+            self.worklog_store.close()
+        self.fetch_engine.close()
+        self.jira_client.close()
+        if self.issue_cache is not None:
+            self.issue_cache.close()
@@ -0,0 +1,104 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from fetchengine import DEFAULT_CONCURRENCY
+from profiler import PROFILER
+from ratelimit import DEFAULT_MAX_REQUESTS_PER_SECOND, RateController
+
+# seconds to wait for Jira to connect / answer
+REQUEST_TIMEOUT = 60
+DEFAULT_MAX_RETRIES = 5
+# rate limit and transient server errors, worth retrying
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+# ==============================================================================
+class JiraClient:
+    """HTTP client shared by all the parsers of a process: a single
+    requests.Session keeping connections to Jira alive between requests"""
+
+    _shared_clients = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        authToken: str = "",
+        poolSize: int = DEFAULT_CONCURRENCY,
+        rateController: RateController = None,
+        maxRetries: int = DEFAULT_MAX_RETRIES,
+    ):
+        self.rate_controller = rateController or RateController()
+        self.max_retries = maxRetries
+        self.session = requests.Session()
+        # one pooled connection per parallel fetch, so no connection is dropped
+        # and re-established when all the fetch engine threads are busy
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, poolSize))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Authorization"] = "Basic " + authToken
+        self.session.headers["Accept"] = "application/json"
+
+    @staticmethod
+    def from_config(config) -> "JiraClient":
+        """Client defined by a config section: token, a connection per parallel
+        fetch, rate limit and retries"""
+        return JiraClient(
+            config["authentication-token"],
+            config.getint("concurrency", DEFAULT_CONCURRENCY),
+            RateController(
+                config.getfloat("maxRequestsPerSecond", DEFAULT_MAX_REQUESTS_PER_SECOND)
+            ),
+            config.getint("maxRetries", DEFAULT_MAX_RETRIES),
+        )
+
+    @classmethod
+    def shared(cls, authToken: str = "") -> "JiraClient":
+        """Process wide client for the token, used when no client is injected"""
+        with cls._shared_lock:
+            if authToken not in cls._shared_clients:
+                cls._shared_clients[authToken] = cls(authToken)
+            return cls._shared_clients[authToken]
+
+    def get(self, url: str, params: dict = None) -> requests.Response:
+        return self.request("GET", url, params=params)
+
+    def post(self, url: str, json: dict = None) -> requests.Response:
+        """POST of a read only query (e.g. worklogs by ids), safe to retry"""
+        return self.request("POST", url, json=json)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Request paced by the rate controller, rate limited (429) and transient
+        failures are retried with backoff. The last response is returned."""
+        attempt = 0
+        while True:
+            with PROFILER.phase("rate limit wait"):
+                self.rate_controller.acquire()
+            try:
+                with PROFILER.phase("http", url=url) as phase:
+                    resp = self.session.request(
+                        method, url, timeout=REQUEST_TIMEOUT, **kwargs
+                    )
+                    phase.add(status=resp.status_code, bytes=len(resp.content))
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                self.rate_controller.backoff(attempt)
+                attempt += 1
+                continue
+
+            self.rate_controller.update(resp.status_code, resp.headers)
+            if resp.status_code in RETRY_STATUS_CODES:
+                PROFILER.count("http retry " + str(resp.status_code))
+            if (
+                resp.status_code not in RETRY_STATUS_CODES
+                or attempt >= self.max_retries
+            ):
+                return resp
+
+            self.rate_controller.backoff(attempt, resp.headers)
+            attempt += 1
+
+    def close(self):
+        self.session.close()
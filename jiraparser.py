@@ -1,5 +1,10 @@
-import requests
-from requests.auth import AuthBase
+import sys
+
+from fetchengine import FetchEngine, FetchResult
+from jiraclient import JiraClient
+from issuecache import IssueCache
+from issuemodel import IssueRecord, SubtasksStats, hours
+from profiler import PROFILER
 
 RED_COLOR = "\033[91m"
 GREEN_COLOR = "\033[92m"
@@ -8,233 +13,416 @@ WARN_COLOR = "\033[95m"
 BLUE_COLOR = "\033[94m"
 ENDTERM = "\033[0m"
 
-
-class TokenAuth(AuthBase):
-    """Implements a custom authentication scheme."""
-
-    def __init__(self, token):
-        self.token = token
-
-    def __call__(self, r):
-        r.headers["Authorization"] = "Basic " + self.token
-        return r
+JIRA_ISSUE_API_PATH = "/rest/api/2/issue/"
+JIRA_SEARCH_API_PATH = "/rest/api/2/search"
+# issue keys per "parent in"/"key in" JQL query, keeps it far below URL/JQL limits
+JQL_KEYS_CHUNK_SIZE = 50
+JIRA_STATUS_API_PATH = "/rest/api/2/status"
+JIRA_WORKLOG_API_PATH = "/rest/api/2/worklog/"
+# max worklog ids of a /worklog/list request
+WORKLOG_IDS_CHUNK_SIZE = 1000
+# marks cache entries holding the status changelog besides the fields
+CHANGELOG_CACHE_FIELD = "*changelog"
+# latest "updated" of the sub-tasks of a cached issue when it was fetched
+SUBTASKS_UPDATED_CACHE_KEY = "*subtasksUpdated"
+SEARCH_PAGE_SIZE = 100
+# searches for the "updated" field only, Jira returns bigger pages of these
+STUB_PAGE_SIZE = 1000
+SUBTASK_FIELDS = ["parent", "issuetype", "status", "timetracking"]
+# fields parse_issue_json reads, the only ones requested by default
+ISSUE_FIELDS = [
+    "subtasks",
+    "issuetype",
+    "status",
+    "timetracking",
+    "progress",
+    "aggregateprogress",
+    "timeestimate",
+    "aggregatetimeestimate",
+    "aggregatetimeoriginalestimate",
+]
+
+
+class JiraRequestError(Exception):
+    """Jira REST API has answered with an unexpected response code"""
+
+    def __init__(self, subject: str, statusCode: int):
+        super().__init__("{} details response code: {}".format(subject, statusCode))
+        self.subject = subject
+        self.status_code = statusCode
 
 
 # ==============================================================================
 class JiraJSONParser:
     """Collecting & parsing Jira tasks via REST API"""
 
-    issue_has_subtasks = False
-    issue_json = {}
-    subtasks_count = 0
-    subtasks_wo_estimation_count = 0
-    subtasks_wo_estimation = []
-    subtasks_original_estimation = 0
-    issue_type_name = "Issue"
-    issue_progress = {}
-    issue_aggregate_progress = {}
-    issue_original_type_name = ""
-    issue_status = ""
     request_params = {"Content-Type": "application/json"}
-    auth_token = ""
-    jira_base_api_url = ""
 
-    def __init__(self, authToken: str = "", jiraBaseAPIURL: str = ""):
+    def __init__(
+        self,
+        authToken: str = "",
+        jiraBaseAPIURL: str = "",
+        fetchEngine: FetchEngine = None,
+        jiraClient: JiraClient = None,
+        issueCache: IssueCache = None,
+        issueFields: list = None,
+    ):
         self.auth_token = authToken
         self.jira_base_api_utl = jiraBaseAPIURL
+        self.jira_search_api_url = JiraJSONParser.search_api_url(jiraBaseAPIURL)
+        # sequential fetching unless a shared engine is given
+        self.fetch_engine = fetchEngine or FetchEngine(1)
+        # warm connections are shared by all the parsers of the process
+        self.jira_client = jiraClient or JiraClient.shared(authToken)
+        # optional, unchanged issues are taken from it instead of being downloaded
+        self.issue_cache = issueCache
+        # {parent key: {sub-task key: json}} found by the cache revalidation,
+        # taken by fetch_subtasks instead of searching them again
+        self.prefetched_subtasks = {}
+        # fields requested for issues, reports reading more fields add theirs
+        self.issue_fields = issueFields or ISSUE_FIELDS
+        # parsed issue state, see parse_issue_json & get_parse_subtasks
+        self.issue = None
+        self.subtasks_stats = SubtasksStats()
+
+    # --- parsed issue state ----------------------------------------------
+
+    @property
+    def issue_key(self) -> str:
+        return self.issue.key
+
+    @property
+    def issue_has_subtasks(self) -> bool:
+        return self.issue.has_subtasks
+
+    @property
+    def issue_type_name(self) -> str:
+        return self.issue.type_name
+
+    @property
+    def issue_original_type_name(self) -> str:
+        return self.issue.original_type_name
+
+    @property
+    def issue_status(self) -> str:
+        return self.issue.status
+
+    @property
+    def subtasks_count(self) -> int:
+        return len(self.issue.subtasks)
+
+    @property
+    def subtasks_wo_estimation(self) -> list:
+        return list(self.subtasks_stats.wo_estimation)
+
+    @property
+    def subtasks_wo_estimation_count(self) -> int:
+        return self.subtasks_stats.wo_estimation_count
+
+    @property
+    def subtasks_original_estimation(self) -> str:
+        return self.convertMsToHours(self.subtasks_stats.original_estimate)
 
-    def get_and_parse(self, issueKey: str):
-        self.issue_has_subtasks = False
-        self.issue_json = {}
-        self.subtasks_count = 0
-        self.subtasks_wo_estimation_count = 0
-        self.subtasks_wo_estimation = []
-        self.subtasks_original_estimation = 0
-        self.issue_type_name = "Issue"
-        self.issue_progress = {}
-        self.issue_aggregate_progress = {}
-        self.issue_original_type_name = ""
-        self.issue_status = ""
-
-        resp = requests.get(
-            self.jira_base_api_utl + issueKey,
-            auth=TokenAuth(self.auth_token),
-            params=self.request_params,
-        )
+    @staticmethod
+    def project_fields(*fieldLists: list) -> list:
+        """Union of the fields needed by several analyses, in the given order"""
+        fields = []
+        for fieldList in fieldLists:
+            for field in fieldList:
+                if field not in fields:
+                    fields.append(field)
+        return fields
 
-        if resp.status_code != 200:
-            raise Exception(
-                "Issue {} details response code: {}".format(issueKey, resp.status_code)
-            )
+    @staticmethod
+    def fields_from_config(config) -> list:
+        """Issue fields plus the extra ones listed in a config section"""
+        extraFields = [
+            field.strip()
+            for field in config.get("extraFields", "").split(",")
+            if field.strip()
+        ]
+        return JiraJSONParser.project_fields(ISSUE_FIELDS, extraFields)
 
-        self.parse_issue_json(resp.json())
+    @staticmethod
+    def from_config(config, issueFields: list = None) -> "JiraJSONParser":
+        """Parser of the Jira defined by a config section, with the fetch
+        engine, client and cache it defines. Parsers made by new_parser share
+        them, close releases them."""
+        return JiraJSONParser(
+            config["authentication-token"],
+            config["jiraURL"] + JIRA_ISSUE_API_PATH,
+            FetchEngine.from_config(config),
+            JiraClient.from_config(config),
+            IssueCache.from_config(config),
+            issueFields,
+        )
 
-    def parse_issue_json(self, issueExternalJson: str):
-        self.issue_json = issueExternalJson
-        self.subtasks_count = len(self.issue_json["fields"]["subtasks"])
-        self.issue_has_subtasks = (
-            not bool(self.issue_json["fields"]["issuetype"]["subtask"])
-            and self.subtasks_count > 0
+    def new_parser(self) -> "JiraJSONParser":
+        """Parser of another issue sharing the engine, client, cache and fields"""
+        return JiraJSONParser(
+            self.auth_token,
+            self.jira_base_api_utl,
+            self.fetch_engine,
+            self.jira_client,
+            self.issue_cache,
+            self.issue_fields,
         )
-        if self.subtasks_count > 0:
-            self.issue_type_name = "Story"
 
-        self.issue_original_type_name = self.issue_json["fields"]["issuetype"]["name"]
-        self.issue_status = self.issue_json["fields"]["status"]["name"]
+    def close(self):
+        self.fetch_engine.close()
+        self.jira_client.close()
+        if self.issue_cache is not None:
+            self.issue_cache.close()
 
-        self.issue_progress["originalEstimate"] = 0
-        if (
-            "timetracking" in self.issue_json["fields"]
-            and "originalEstimateSeconds" in self.issue_json["fields"]["timetracking"]
-        ):
-            self.issue_progress["originalEstimate"] = self.issue_json["fields"][
-                "timetracking"
-            ]["originalEstimateSeconds"]
+    def cached_fields(self, fields: list) -> list:
+        """Fields to request for an issue to be cached: "updated" is needed to
+        revalidate the entry next time"""
+        if self.issue_cache is None or "updated" in fields:
+            return fields
+        return fields + ["updated"]
 
-        self.issue_progress["total"] = self.issue_json["fields"]["progress"]["total"]
-        self.issue_progress["progress"] = self.issue_json["fields"]["progress"][
-            "progress"
-        ]
-        self.issue_progress["progressPercent"] = 0
-        if "percent" in self.issue_json["fields"]["progress"]:
-            self.issue_progress["progressPercent"] = self.issue_json["fields"][
-                "progress"
-            ]["percent"]
-
-        self.issue_progress["timeLeft"] = 0
-        if self.issue_json["fields"]["timeestimate"] != None:
-            self.issue_progress["timeLeft"] = self.issue_json["fields"]["timeestimate"]
-
-        self.issue_aggregate_progress["originalEstimate"] = 0
-        self.issue_aggregate_progress["total"] = 0
-        self.issue_aggregate_progress["progress"] = 0
-        self.issue_aggregate_progress["progressPercent"] = 0
-        self.issue_aggregate_progress["timeLeft"] = 0
-
-        if (
-            self.issue_has_subtasks
-            and self.issue_json["fields"]
-            and self.issue_json["fields"]["aggregateprogress"]
-        ):
-            if (
-                self.issue_json["fields"]
-                and self.issue_json["fields"]["aggregatetimeoriginalestimate"]
-            ):
-                self.issue_aggregate_progress["originalEstimate"] = self.issue_json[
-                    "fields"
-                ]["aggregatetimeoriginalestimate"]
+    @staticmethod
+    def has_aggregates(fields: list) -> bool:
+        """Aggregated fields change with the sub-tasks, the issue "updated"
+        stays the same"""
+        return any(field.startswith("aggregate") for field in fields)
+
+    def subtasks_updated(self, parentKeys: list, parallel: bool = False) -> dict:
+        """{parent key: latest "updated" of its sub-tasks}, parents with no
+        sub-tasks are left out. The sub-tasks found are kept for fetch_subtasks,
+        so the revalidation costs no search of its own. Parallel searches run
+        on the fetch engine and must not be started from its jobs."""
+        chunks = JiraJSONParser.key_chunks(parentKeys)
+        fields = SUBTASK_FIELDS + ["updated"]
+        if parallel:
+            results = self.fetch_engine.map(
+                lambda chunk: self.search_subtasks(chunk, fields), chunks
+            )
+        else:
+            results = (
+                FetchResult(chunk, self.search_subtasks(chunk, fields))
+                for chunk in chunks
+            )
 
-            self.issue_aggregate_progress["total"] = self.issue_json["fields"][
-                "aggregateprogress"
-            ]["total"]
-            self.issue_aggregate_progress["progress"] = self.issue_json["fields"][
-                "aggregateprogress"
-            ]["progress"]
+        subtasksUpdated = {}
+        for result in results:
+            if result.error is not None:
+                raise result.error
+            prefetched = {parentKey: {} for parentKey in result.item}
+            for subtask in result.value:
+                parentKey = subtask["fields"]["parent"]["key"]
+                prefetched.setdefault(parentKey, {})[subtask["key"]] = subtask
+                subtasksUpdated[parentKey] = max(
+                    subtasksUpdated.get(parentKey, ""), subtask["fields"]["updated"]
+                )
+            self.prefetched_subtasks.update(prefetched)
+        return subtasksUpdated
+
+    def cache_issue(self, fields: list, issueJson: dict, subtasksUpdated: dict):
+        """Cache the issue together with its sub-tasks "updated", read before
+        the issue was fetched so a sub-task changed meanwhile refreshes it"""
+        if self.has_aggregates(fields):
+            issueJson = dict(issueJson)
+            issueJson[SUBTASKS_UPDATED_CACHE_KEY] = subtasksUpdated.get(
+                issueJson["key"]
+            )
+        self.issue_cache.put(issueJson["key"], fields, issueJson)
 
-            if "percent" in self.issue_json["fields"]["aggregateprogress"]:
-                self.issue_aggregate_progress["progressPercent"] = self.issue_json[
-                    "fields"
-                ]["aggregateprogress"]["percent"]
+    @staticmethod
+    def search_api_url(jiraBaseAPIURL: str) -> str:
+        """Search endpoint URL for the same Jira installation as the issue endpoint"""
+        if jiraBaseAPIURL.endswith(JIRA_ISSUE_API_PATH):
+            return jiraBaseAPIURL[: -len(JIRA_ISSUE_API_PATH)] + JIRA_SEARCH_API_PATH
+        return jiraBaseAPIURL
 
-        if (not self.issue_has_subtasks
-            and self.issue_json["fields"]
-            and self.issue_json["fields"]["aggregateprogress"]
-            and "total" in self.issue_json["fields"]["aggregateprogress"]
-            ):
-            self.issue_aggregate_progress["originalEstimate"] = self.issue_json["fields"]["aggregateprogress"]["total"]
-            self.issue_aggregate_progress["progress"] = self.issue_json["fields"]["aggregateprogress"]["progress"]
+    def api_url(self, path: str) -> str:
+        """URL of another REST API path of the same Jira installation"""
+        return self.jira_base_api_utl[: -len(JIRA_ISSUE_API_PATH)] + path
 
-        if (not self.issue_has_subtasks
-            and self.issue_json["fields"]
-            and self.issue_json["fields"]["progress"]
-            and "total" in self.issue_json["fields"]["progress"]
-            ):
-            self.issue_progress["originalEstimate"] = self.issue_json["fields"]["progress"]["total"]
-            self.issue_progress["progress"] = self.issue_json["fields"]["progress"]["progress"]
+    def get_json(self, url: str, params: dict = {}, subject: str = "") -> dict:
+        resp = self.jira_client.get(url, params={**self.request_params, **params})
 
-        if self.issue_json["fields"]["aggregatetimeestimate"] != None:
-            self.issue_aggregate_progress["timeLeft"] = self.issue_json["fields"][
-                "aggregatetimeestimate"
-            ]
+        if resp.status_code != 200:
+            raise JiraRequestError(subject, resp.status_code)
 
-        self.issue_progress["timeLeftOriginal"] = 0
-        if self.issue_progress["originalEstimate"] > 0:
-            self.issue_progress["timeLeftOriginal"] = (
-                self.issue_progress["originalEstimate"] - self.issue_progress["progress"]
-            )
+        with PROFILER.phase("json decode"):
+            return resp.json()
 
-        self.issue_aggregate_progress["timeLeftOriginal"] = 0
-        if self.issue_aggregate_progress["originalEstimate"] > 0:
-            self.issue_aggregate_progress["timeLeftOriginal"] = (
-                self.issue_aggregate_progress["originalEstimate"]
-                - self.issue_aggregate_progress["progress"]
+    def post_json(self, url: str, body: dict, subject: str = ""):
+        resp = self.jira_client.post(url, json=body)
+
+        if resp.status_code != 200:
+            raise JiraRequestError(subject, resp.status_code)
+
+        with PROFILER.phase("json decode"):
+            return resp.json()
+
+    def get_issue_json(self, issueKey: str) -> dict:
+        if self.issue_cache is not None:
+            cached = self.issue_cache.get(issueKey, self.issue_fields)
+            if cached is not None and self.is_up_to_date(cached):
+                PROFILER.count("issue cache hit")
+                return cached
+            PROFILER.count("issue cache miss")
+            subtasksUpdated = {}
+            if self.has_aggregates(self.issue_fields):
+                subtasksUpdated = self.subtasks_updated([issueKey])
+
+        issueJson = self.get_json(
+            self.jira_base_api_utl + issueKey,
+            params={"fields": ",".join(self.cached_fields(self.issue_fields))},
+            subject="Issue " + issueKey,
+        )
+        if self.issue_cache is not None:
+            self.cache_issue(self.issue_fields, issueJson, subtasksUpdated)
+        return issueJson
+
+    def is_up_to_date(self, cachedJson: dict) -> bool:
+        # revalidate with a search returning the "updated" field only, and the
+        # sub-tasks one if the issue aggregates them
+        subtasksUpdated = cachedJson.pop(SUBTASKS_UPDATED_CACHE_KEY, None)
+        try:
+            current = next(
+                self.fetch_search_pages("key = " + cachedJson["key"], ["updated"])
             )
+            if len(current["issues"]) == 0 or current["issues"][0]["fields"][
+                "updated"
+            ] != cachedJson["fields"].get("updated"):
+                return False
+            if not self.has_aggregates(self.issue_fields) or not cachedJson[
+                "fields"
+            ].get("subtasks"):
+                return True
+            return subtasksUpdated == self.subtasks_updated([cachedJson["key"]]).get(
+                cachedJson["key"]
+            )
+        except JiraRequestError:
+            return False
 
-    def get_parse_subtasks(self, logProgress: bool = True):
-        self.subtasks_wo_estimation_count = 0
-        self.subtasks_original_estimation = 0
-        self.subtasks_wo_estimation = []
+    def get_and_parse(self, issueKey: str):
+        self.parse_issue_json(self.get_issue_json(issueKey))
+
+    def parse_issue_json(self, issueExternalJson: dict):
+        """Parse the issue into a compact record, no reference to the JSON is kept"""
+        with PROFILER.phase("parse issue"):
+            self.issue = IssueRecord.from_json(issueExternalJson)
+        self.subtasks_stats = SubtasksStats()
+
+    def get_parse_subtasks(
+        self, logProgress: bool = True, subtasks: dict = None
+    ) -> dict:
+        """Count sub-tasks estimations. Sub-tasks already fetched by fetch_subtasks
+        for a batch of parents can be passed in to skip the request. Returns the
+        issue sub-tasks JSON by key."""
+        self.subtasks_stats = SubtasksStats()
 
-        i = 0
         if self.issue_has_subtasks:
-            printLine = "Subtasks count: " + str(self.subtasks_count) + " "
-
             if logProgress:
                 print("")
-                print(printLine)
-
-            for subtask in self.issue_json["fields"]["subtasks"]:
-
-                if logProgress:
-                    # sys.stdout.write('\\')
-                    loader = "/"
-                    if i == 1:
-                        loader = "\\"
-                        i = 0
-                    else:
-                        i = 1
-                    print("\033[F" + printLine + loader)
-
-                subtaskURL = self.jira_base_api_utl + subtask["key"]
-                resp = requests.get(
-                    subtaskURL,
-                    auth=TokenAuth(self.auth_token),
-                    params=self.request_params,
-                )
+                print("Subtasks count: " + str(self.subtasks_count))
+
+            if subtasks is None:
+                subtasks = self.fetch_subtasks([self.issue.key])
+            return self.parse_subtasks_json(subtasks.get(self.issue.key, {}))
+        return {}
+
+    def fetch_subtasks(self, parentKeys: list) -> dict:
+        """Fetch sub-tasks of all the given parents with bulk searches instead of
+        one request per sub-task, running the searches on the fetch engine.
+        Sub-tasks found by the cache revalidation are not searched again.
+        Returns {parent key: {sub-task key: json}}"""
+        subtasks = {}
+        searchedKeys = []
+        for parentKey in parentKeys:
+            prefetched = self.prefetched_subtasks.pop(parentKey, None)
+            if prefetched is None:
+                searchedKeys.append(parentKey)
+            elif len(prefetched) > 0:
+                subtasks[parentKey] = prefetched
+
+        for chunk in self.fetch_engine.map(
+            self.search_subtasks, JiraJSONParser.key_chunks(searchedKeys)
+        ):
+            # sub-tasks of a failed chunk are requested one by one
+            # by parse_subtasks_json, so errors end up per issue
+            if chunk.error is not None:
+                continue
+            for subtask in chunk.value:
+                parentKey = subtask["fields"]["parent"]["key"]
+                subtasks.setdefault(parentKey, {})[subtask["key"]] = subtask
+
+        return subtasks
+
+    def search_subtasks(self, parentKeys: list, fields: list = SUBTASK_FIELDS) -> list:
+        # not search_pages: sub-tasks fields are small, revalidating them in
+        # the cache would take as many requests as searching them
+        return [
+            subtask
+            for page in self.fetch_search_pages(
+                "parent in (" + ",".join(parentKeys) + ")", fields
+            )
+            for subtask in page["issues"]
+        ]
 
-                if resp.status_code != 200:
-                    raise Exception(
-                        "Issue {} details response code: {}".format(
-                            subtask["key"], resp.status_code
-                        )
-                    )
-
-                subtaskJson = resp.json()
-                if "originalEstimate" not in subtaskJson["fields"]["timetracking"]:
-                    self.subtasks_wo_estimation.append(subtask["key"])
-                    if subtask["fields"]["status"]["name"] != "Done":
-                        self.subtasks_wo_estimation_count += 1
-                        # print(', ESTIMATION needed!')
-                else:
-                    if (
-                        "originalEstimateSeconds"
-                        in subtaskJson["fields"]["timetracking"]
-                    ):
-                        self.subtasks_original_estimation += subtaskJson["fields"][
-                            "timetracking"
-                        ]["originalEstimateSeconds"]
-                        # print(', originalEstimate = ', self.convertMsToHours(subtaskJson['fields']['timetracking']['originalEstimateSeconds']))
-
-        self.subtasks_original_estimation = self.convertMsToHours(
-            self.subtasks_original_estimation
-        )
+    def search_keys(self, issueKeys: list, fields: list, expand: str = None) -> list:
+        """Issues of a chunk of keys found by a "key in" search"""
+        return [
+            issue
+            for page in self.fetch_search_pages(
+                "key in (" + ",".join(issueKeys) + ")",
+                fields,
+                len(issueKeys),
+                expand=expand,
+            )
+            for issue in page["issues"]
+        ]
+
+    @staticmethod
+    def key_chunks(keys: list) -> list:
+        """Keys split to fit "key in" and "parent in" JQL clauses"""
+        return [
+            keys[i : i + JQL_KEYS_CHUNK_SIZE]
+            for i in range(0, len(keys), JQL_KEYS_CHUNK_SIZE)
+        ]
+
+    def parse_subtasks_json(self, subtasksJson: dict) -> dict:
+        """Count estimations of the issue sub-tasks fetched by fetch_subtasks.
+        Returns the sub-tasks JSON, a new dict if missing ones were fetched."""
+        # not returned by the search (e.g. moved meanwhile) - fetch directly
+        missingKeys = [
+            subtaskKey
+            for subtaskKey, _ in self.issue.subtasks
+            if subtaskKey not in subtasksJson
+        ]
+        if len(missingKeys) > 0:
+            subtasksJson = dict(subtasksJson)
+            for fetched in self.fetch_engine.map(self.get_issue_json, missingKeys):
+                if fetched.error is not None:
+                    raise fetched.error
+                subtasksJson[fetched.item] = fetched.value
+
+        with PROFILER.phase("parse subtasks"):
+            self.subtasks_stats = SubtasksStats.from_json(self.issue, subtasksJson)
+        return subtasksJson
 
     def convertMsToHours(self, valueMs: int, showUnit: bool = True) -> str:
-        result = str(valueMs / 3600)
+        result = hours(valueMs)
         if showUnit:
             result += "h"
         return result
 
+    @staticmethod
+    def board_query_from_config(config) -> dict:
+        """form_jql_query arguments of the board defined by a config section:
+        stories and tasks of the project, of the board filter if there is one"""
+        boardQuery = {
+            "projectId": config["issueKey"],
+            "taskTypes": ["Story", "Task"],
+        }
+        if "filterId" in config:
+            boardQuery["filter"] = int(config["filterId"])
+        return boardQuery
+
     @staticmethod
     def form_jql_query(
         projectId: str,
@@ -242,6 +430,9 @@ class JiraJSONParser:
         excludeOpen: bool = True,
         filter: int = 0,
         taskTypes=["Task", "Story", "Bug"],
+        updatedWithinMinutes: int = 0,
+        issueKeys: list = None,
+        resolvedWithinDays: int = 0,
     ) -> str:
         jSQLString = (
             'project = "' + projectId + '" and type in (' + ",".join(taskTypes) + ")"
@@ -252,9 +443,423 @@ class JiraJSONParser:
             jSQLString += " AND status != Done"
         if excludeOpen:
             jSQLString += " AND status != Open"
+        # relative date, so Jira user timezone does not matter
+        if updatedWithinMinutes > 0:
+            jSQLString += " AND updated >= -" + str(updatedWithinMinutes) + "m"
+        # open issues and the ones done recently
+        if resolvedWithinDays > 0:
+            jSQLString += (
+                " AND (resolution = Unresolved OR resolved >= -"
+                + str(resolvedWithinDays)
+                + "d)"
+            )
+        if issueKeys:
+            jSQLString += " AND key in (" + ",".join(issueKeys) + ")"
         jSQLString += " ORDER BY created DESC"
         return jSQLString
 
+    def search_pages(
+        self,
+        jql: str,
+        fields: list = None,
+        pageSize: int = SEARCH_PAGE_SIZE,
+        parallel: bool = False,
+    ):
+        """Walk search results page by page (startAt/maxResults), only one page
+        is kept in memory at a time. Issue fields are requested by default.
+        With a cache, pages of STUB_PAGE_SIZE are searched for the "updated"
+        field only and issues changed since caching are downloaded, by the fetch
+        engine: not to be called from its jobs then."""
+        if fields is None:
+            fields = self.issue_fields
+        if self.issue_cache is None:
+            yield from self.fetch_search_pages(jql, fields, pageSize, parallel)
+            return
+
+        for page in self.fetch_search_pages(jql, ["updated"], STUB_PAGE_SIZE, parallel):
+            page["issues"] = self.resolve_cached_issues(page["issues"], fields)
+            yield page
+
+    def fetch_search_pages(
+        self,
+        jql: str,
+        fields: list = None,
+        pageSize: int = SEARCH_PAGE_SIZE,
+        parallel: bool = False,
+        expand: str = None,
+    ):
+        if parallel:
+            yield from self.fetch_search_pages_parallel(
+                jql, fields, pageSize, expand=expand
+            )
+            return
+
+        startAt = 0
+        while True:
+            page = self.fetch_search_page(jql, fields, pageSize, startAt, expand)
+            yield page
+
+            startAt += len(page["issues"])
+            if len(page["issues"]) == 0 or startAt >= page["total"]:
+                break
+
+    def fetch_search_pages_parallel(
+        self,
+        jql: str,
+        fields: list = None,
+        pageSize: int = SEARCH_PAGE_SIZE,
+        fetchMissed: bool = True,
+        expand: str = None,
+    ):
+        """Once the first page tells the total, all the other startAt offsets are
+        fetched concurrently by the fetch engine and yielded in the query order.
+        Issues entering or leaving the results meanwhile shift the offsets, so
+        repeated issues are dropped and skipped ones are fetched at the end.
+        Must not be called from fetch engine jobs."""
+        first = self.fetch_search_page(jql, fields, pageSize, 0, expand)
+        seenKeys = set()
+        received = len(first["issues"])
+        yield JiraJSONParser.drop_seen_issues(first, seenKeys)
+        if len(first["issues"]) == 0:
+            return
+
+        # Jira may return less issues per page than asked for
+        pageSize = len(first["issues"])
+        for result in self.fetch_engine.map(
+            lambda startAt: self.fetch_search_page(
+                jql, fields, pageSize, startAt, expand
+            ),
+            range(pageSize, first["total"], pageSize),
+        ):
+            if result.error is not None:
+                raise result.error
+            received += len(result.value["issues"])
+            yield JiraJSONParser.drop_seen_issues(result.value, seenKeys)
+
+        if not fetchMissed or received == len(seenKeys) == first["total"]:
+            return
+        missed = self.fetch_missed_issues(jql, fields, seenKeys, expand)
+        if len(missed) > 0:
+            # on stderr, stdout may carry rows for other tools
+            print(
+                RED_COLOR
+                + "Warning"
+                + ENDTERM
+                + ": search results changed while paging, "
+                + str(len(missed))
+                + " skipped issues fetched again",
+                file=sys.stderr,
+            )
+            yield {"startAt": received, "total": first["total"], "issues": missed}
+
+    def fetch_search_page(
+        self, jql: str, fields: list, pageSize: int, startAt: int, expand: str = None
+    ) -> dict:
+        params = {"jql": jql, "maxResults": pageSize, "startAt": startAt}
+        if fields:
+            params["fields"] = ",".join(fields)
+        if expand:
+            params["expand"] = expand
+        return self.get_json(
+            self.jira_search_api_url, params=params, subject="Search " + jql
+        )
+
+    @staticmethod
+    def drop_seen_issues(page: dict, seenKeys: set) -> dict:
+        """Remove issues already returned by previous pages, remembering the rest"""
+        issues = []
+        for issue in page["issues"]:
+            if issue["key"] not in seenKeys:
+                seenKeys.add(issue["key"])
+                issues.append(issue)
+        page["issues"] = issues
+        return page
+
+    def fetch_missed_issues(
+        self, jql: str, fields: list, seenKeys: set, expand: str = None
+    ) -> list:
+        """Issues of the query not in seenKeys: the keys are searched again with
+        the "updated" field only, missed issues are fetched with "key in" searches
+        and returned in the query order"""
+        missedKeys = []
+        for page in self.fetch_search_pages_parallel(
+            jql, ["updated"], STUB_PAGE_SIZE, fetchMissed=False
+        ):
+            missedKeys += [
+                issue["key"] for issue in page["issues"] if issue["key"] not in seenKeys
+            ]
+
+        missed = {}
+        for chunk in JiraJSONParser.key_chunks(missedKeys):
+            for issue in self.search_keys(chunk, fields, expand):
+                missed[issue["key"]] = issue
+
+        seenKeys.update(missed)
+        return [missed[key] for key in missedKeys if key in missed]
+
+    def resolve_cached_issues(self, issueStubs: list, fields: list) -> list:
+        """Full issues JSON for search results holding the "updated" field only:
+        unchanged ones from the cache, the rest with "key in" searches run by
+        the fetch engine. Issues with aggregated fields are unchanged if their
+        sub-tasks are too."""
+        issues = {}
+        changedKeys = []
+        cachedSubtasksUpdated = {}
+        for stub in issueStubs:
+            cached = self.issue_cache.get(stub["key"], fields)
+            if cached is not None and cached["fields"].get("updated") == stub[
+                "fields"
+            ].get("updated"):
+                cachedSubtasksUpdated[stub["key"]] = cached.pop(
+                    SUBTASKS_UPDATED_CACHE_KEY, None
+                )
+                issues[stub["key"]] = cached
+            else:
+                changedKeys.append(stub["key"])
+
+        # sub-tasks left by the previous page are not needed anymore
+        self.prefetched_subtasks = {}
+        subtasksUpdated = {}
+        if self.has_aggregates(fields):
+            # changed issues are searched too: their sub-tasks "updated" goes
+            # to the cache with them, and the sub-tasks to fetch_subtasks
+            parentKeys = [
+                key for key, issue in issues.items() if issue["fields"].get("subtasks")
+            ]
+            subtasksUpdated = self.subtasks_updated(
+                parentKeys + changedKeys, parallel=True
+            )
+            for key in parentKeys:
+                if cachedSubtasksUpdated[key] != subtasksUpdated.get(key):
+                    del issues[key]
+                    changedKeys.append(key)
+        PROFILER.count("issue cache hit", len(issues))
+        PROFILER.count("issue cache miss", len(changedKeys))
+
+        cachedFields = self.cached_fields(fields)
+        for result in self.fetch_engine.map(
+            lambda chunk: self.search_keys(chunk, cachedFields),
+            JiraJSONParser.key_chunks(changedKeys),
+        ):
+            if result.error is not None:
+                raise result.error
+            for issue in result.value:
+                self.cache_issue(fields, issue, subtasksUpdated)
+                issues[issue["key"]] = issue
+
+        return [issues[stub["key"]] for stub in issueStubs if stub["key"] in issues]
+
+    def search_issues(
+        self,
+        jql: str,
+        fields: list = None,
+        pageSize: int = SEARCH_PAGE_SIZE,
+        parallel: bool = False,
+    ):
+        """Yield search results one issue at a time, fetching pages lazily"""
+        for page in self.search_pages(jql, fields, pageSize, parallel):
+            yield from page["issues"]
+
+    def search_board_changes(
+        self, boardQuery: dict, windowMinutes: int, boardKeys: set
+    ) -> tuple:
+        """Board issues changed within the last minutes: (issues JSON, keys of
+        issues which have left the board). boardKeys are the issues known so
+        far, form_jql_query arguments define the board."""
+        changed = list(
+            self.search_issues(
+                JiraJSONParser.form_jql_query(
+                    **boardQuery, updatedWithinMinutes=windowMinutes
+                ),
+                parallel=True,
+            )
+        )
+        changedKeys = {issue["key"] for issue in changed}
+
+        # everything updated in the project: board issues missing in the changed
+        # ones have left the board, updated sub-tasks change their stories
+        droppedKeys = set()
+        staleParentKeys = set()
+        for page in self.fetch_search_pages(
+            'project = "'
+            + boardQuery["projectId"]
+            + '" AND updated >= -'
+            + str(windowMinutes)
+            + "m",
+            ["parent"],
+            parallel=True,
+        ):
+            for issue in page["issues"]:
+                if issue["key"] in boardKeys and issue["key"] not in changedKeys:
+                    droppedKeys.add(issue["key"])
+                parent = issue["fields"].get("parent")
+                if parent and parent["key"] in boardKeys:
+                    staleParentKeys.add(parent["key"])
+
+        staleParentKeys = sorted(staleParentKeys - changedKeys - droppedKeys)
+        for i in range(0, len(staleParentKeys), JQL_KEYS_CHUNK_SIZE):
+            chunk = staleParentKeys[i : i + JQL_KEYS_CHUNK_SIZE]
+            refreshed = list(
+                self.search_issues(
+                    JiraJSONParser.form_jql_query(**boardQuery, issueKeys=chunk)
+                )
+            )
+            changed += refreshed
+            droppedKeys.update(set(chunk) - {issue["key"] for issue in refreshed})
+
+        return changed, droppedKeys
+
+    def get_statuses(self) -> dict:
+        """{status id: (name, status category key: new, indeterminate, done)}"""
+        statuses = self.get_json(self.api_url(JIRA_STATUS_API_PATH), subject="Statuses")
+        return {
+            status["id"]: (status["name"], status["statusCategory"]["key"])
+            for status in statuses
+        }
+
+    def get_changelog_histories(self, issueKey: str) -> list:
+        """All the changelog histories of an issue, paged (Jira Cloud), or
+        expanded on the issue where the changelog endpoint is missing (Jira
+        Server)"""
+        histories = []
+        try:
+            while True:
+                page = self.get_json(
+                    self.jira_base_api_utl + issueKey + "/changelog",
+                    params={"startAt": len(histories), "maxResults": SEARCH_PAGE_SIZE},
+                    subject="Changelog " + issueKey,
+                )
+                histories += page["values"]
+                if len(page["values"]) == 0 or page.get("isLast", True):
+                    return histories
+        except JiraRequestError as error:
+            if error.status_code != 404 or len(histories) > 0:
+                raise
+        return self.get_json(
+            self.jira_base_api_utl + issueKey,
+            params={"fields": "status", "expand": "changelog"},
+            subject="Changelog " + issueKey,
+        )["changelog"]["histories"]
+
+    def complete_changelogs(self, issues: list) -> list:
+        """Search results expanded with changelog hold its first histories only,
+        truncated ones are fetched per issue. Histories are reduced to status
+        changes. Must not be called from fetch engine jobs."""
+        truncated = [
+            issue
+            for issue in issues
+            if issue["changelog"]["total"] > len(issue["changelog"]["histories"])
+        ]
+        PROFILER.count("changelog truncated", len(truncated))
+        for result in self.fetch_engine.map(
+            lambda issue: self.get_changelog_histories(issue["key"]), truncated
+        ):
+            if result.error is not None:
+                raise result.error
+            result.item["changelog"]["histories"] = result.value
+
+        for issue in issues:
+            histories = []
+            for history in issue["changelog"]["histories"]:
+                items = [item for item in history["items"] if item["field"] == "status"]
+                if len(items) > 0:
+                    histories.append({"created": history["created"], "items": items})
+            issue["changelog"] = {"histories": histories}
+        return issues
+
+    def search_changelogs(
+        self, jql: str, fields: list, pageSize: int = SEARCH_PAGE_SIZE
+    ):
+        """Walk search results expanded with the status changelog, pages are
+        fetched in parallel. With a cache, pages are searched for the "updated"
+        field only and changelogs of issues changed since caching are fetched
+        with "key in" searches. Must not be called from fetch engine jobs."""
+        if self.issue_cache is None:
+            for page in self.fetch_search_pages(
+                jql, fields, pageSize, parallel=True, expand="changelog"
+            ):
+                page["issues"] = self.complete_changelogs(page["issues"])
+                yield page
+            return
+
+        cacheFields = fields + [CHANGELOG_CACHE_FIELD]
+        for page in self.fetch_search_pages(jql, ["updated"], pageSize, parallel=True):
+            issues = {}
+            changedKeys = []
+            for stub in page["issues"]:
+                cached = self.issue_cache.get(stub["key"], cacheFields)
+                if cached is not None and cached["fields"].get("updated") == stub[
+                    "fields"
+                ].get("updated"):
+                    issues[stub["key"]] = cached
+                else:
+                    changedKeys.append(stub["key"])
+            PROFILER.count("changelog cache hit", len(issues))
+            PROFILER.count("changelog cache miss", len(changedKeys))
+
+            changed = []
+            for i in range(0, len(changedKeys), JQL_KEYS_CHUNK_SIZE):
+                chunk = changedKeys[i : i + JQL_KEYS_CHUNK_SIZE]
+                for changedPage in self.fetch_search_pages(
+                    "key in (" + ",".join(chunk) + ")",
+                    self.cached_fields(fields),
+                    len(chunk),
+                    expand="changelog",
+                ):
+                    changed += changedPage["issues"]
+            for issue in self.complete_changelogs(changed):
+                self.issue_cache.put(issue["key"], cacheFields, issue)
+                issues[issue["key"]] = issue
+
+            page["issues"] = [
+                issues[stub["key"]] for stub in page["issues"] if stub["key"] in issues
+            ]
+            yield page
+
+    def fetch_worklog_changes(self, change: str, since: int) -> tuple:
+        """(ids, until) of worklogs "updated" or "deleted" after since, both
+        are Unix times in milliseconds"""
+        ids = []
+        while True:
+            page = self.get_json(
+                self.api_url(JIRA_WORKLOG_API_PATH + change),
+                params={"since": since},
+                subject="Worklogs " + change,
+            )
+            ids += [value["worklogId"] for value in page["values"]]
+            since = max(since, page.get("until") or 0)
+            if len(page["values"]) == 0 or page.get("lastPage", True):
+                return ids, since
+
+    def sync_worklogs(self, worklogStore) -> int:
+        """Bring a worklog store up to date: ids of worklogs changed since its
+        cursor, then the new and edited worklogs in batches, fetched in
+        parallel. Returns how many worklogs were downloaded. Must not be
+        called from fetch engine jobs."""
+        since = worklogStore.since()
+        updatedIds, updatedUntil = self.fetch_worklog_changes("updated", since)
+        deletedIds, _ = self.fetch_worklog_changes("deleted", since)
+
+        worklogs = []
+        for result in self.fetch_engine.map(
+            lambda ids: self.post_json(
+                self.api_url(JIRA_WORKLOG_API_PATH + "list"), {"ids": ids}, "Worklogs"
+            ),
+            [
+                updatedIds[i : i + WORKLOG_IDS_CHUNK_SIZE]
+                for i in range(0, len(updatedIds), WORKLOG_IDS_CHUNK_SIZE)
+            ],
+        ):
+            if result.error is not None:
+                raise result.error
+            worklogs += result.value
+
+        # both lists are read to their end, deletions after the updated ones
+        # are listed again next time
+        worklogStore.update(worklogs, deletedIds, updatedUntil)
+        PROFILER.count("worklogs synced", len(worklogs))
+        return len(worklogs)
+
     # --- output related ------------------------------------------------
 
     def print_general_info(self):
@@ -266,177 +871,74 @@ class JiraJSONParser:
             termColor = GREEN_COLOR
         if self.issue_status == "To Do" or self.issue_status == "Open":
             termColor = BLUE_COLOR
-        print(self.issue_type_name + " status:", termColor + self.issue_status + ENDTERM)
+        print(
+            self.issue_type_name + " status:", termColor + self.issue_status + ENDTERM
+        )
 
     def print_progress_info(self):
-        if (
-            self.issue_progress["total"] > 0
-            or self.issue_progress["originalEstimate"] > 0
-        ):
+        if self.issue.progress.total > 0 or self.issue.progress.original_estimate > 0:
             print("")
             print("Exact " + self.issue_type_name.lower() + " progress:")
             print(
                 " Original estimation = ",
-                self.convertMsToHours(self.issue_progress["originalEstimate"]),
+                self.convertMsToHours(self.issue.progress.original_estimate),
             )
-            print(" Total:", self.convertMsToHours(self.issue_progress["total"]))
-            print(" Progress:", self.convertMsToHours(self.issue_progress["progress"]))
-            print(" ", str(self.issue_progress["progressPercent"]) + "%")
+            print(" Total:", self.convertMsToHours(self.issue.progress.total))
+            print(" Progress:", self.convertMsToHours(self.issue.progress.progress))
+            print(" ", str(self.issue.progress.percent) + "%")
             timeLeftColor = GREEN_COLOR
-            if self.issue_progress["timeLeft"] <= 0:
+            if self.issue.progress.time_left <= 0:
                 timeLeftColor = RED_COLOR
             print(
                 " Time left: ",
                 timeLeftColor
-                + self.convertMsToHours(self.issue_progress["timeLeft"])
+                + self.convertMsToHours(self.issue.progress.time_left)
                 + ENDTERM,
             )
             timeLeftColor = GREEN_COLOR
-            if self.issue_progress["timeLeftOriginal"] <= 0:
+            if self.issue.progress.time_left_original <= 0:
                 timeLeftColor = RED_COLOR
             print(
                 " Time left (original): ",
                 timeLeftColor
-                + self.convertMsToHours(self.issue_progress["timeLeftOriginal"])
+                + self.convertMsToHours(self.issue.progress.time_left_original)
                 + ENDTERM,
             )
 
-        if self.issue_aggregate_progress["total"] > 0 and self.issue_has_subtasks:
+        if self.issue.aggregate_progress.total > 0 and self.issue_has_subtasks:
             print("")
             print("Aggregated progress:")
             print(
                 " Original estimation = ",
-                self.convertMsToHours(self.issue_aggregate_progress["originalEstimate"]),
-            )
-            print(
-                " Total:", self.convertMsToHours(self.issue_aggregate_progress["total"])
+                self.convertMsToHours(self.issue.aggregate_progress.original_estimate),
             )
+            print(" Total:", self.convertMsToHours(self.issue.aggregate_progress.total))
             print(
                 " Progress:",
-                self.convertMsToHours(self.issue_aggregate_progress["progress"]),
+                self.convertMsToHours(self.issue.aggregate_progress.progress),
             )
-            print(" ", str(self.issue_aggregate_progress["progressPercent"]) + "%")
+            print(" ", str(self.issue.aggregate_progress.percent) + "%")
             timeLeftColor = GREEN_COLOR
-            if self.issue_aggregate_progress["timeLeft"] <= 0:
+            if self.issue.aggregate_progress.time_left <= 0:
                 timeLeftColor = RED_COLOR
             print(
                 " Time left: ",
                 timeLeftColor
-                + self.convertMsToHours(self.issue_aggregate_progress["timeLeft"])
+                + self.convertMsToHours(self.issue.aggregate_progress.time_left)
                 + ENDTERM,
             )
             timeLeftColor = GREEN_COLOR
-            if self.issue_aggregate_progress["timeLeftOriginal"] <= 0:
+            if self.issue.aggregate_progress.time_left_original <= 0:
                 timeLeftColor = RED_COLOR
             print(
                 " Time left (original): ",
                 timeLeftColor
-                + self.convertMsToHours(self.issue_aggregate_progress["timeLeftOriginal"])
+                + self.convertMsToHours(
+                    self.issue.aggregate_progress.time_left_original
+                )
                 + ENDTERM,
             )
 
-    def get_compact_progress_info(self) -> str:
-        originalInfoLine = ""
-        if (
-            self.issue_progress["total"] > 0
-            or self.issue_progress["originalEstimate"] > 0
-        ):
-            estimation = self.issue_progress["originalEstimate"]
-
-            originalColor = ""
-            originalEndColor = ""
-
-            if self.issue_progress["originalEstimate"] == 0:
-                originalColor = RED_COLOR
-                originalEndColor = ENDTERM
-
-            originalInfoLine += (
-                "Original: e"
-                + originalColor
-                + self.convertMsToHours(estimation)
-                + originalEndColor
-                + ", p"
-            )
-            totalColor = ""
-            totalEndColor = ""
-            if self.issue_progress["total"] > self.issue_progress["originalEstimate"]:
-                totalColor = WARN_COLOR
-                totalEndColor = ENDTERM
-            originalInfoLine += (
-                self.convertMsToHours(self.issue_progress["progress"], False)
-                + "/"
-                + totalColor
-                + self.convertMsToHours(self.issue_progress["total"])
-                + totalEndColor
-            )
-            originalInfoLine += ", " + str(self.issue_progress["progressPercent"]) + "%"
-            timeLeftColor = GREEN_COLOR
-            if self.issue_progress["timeLeft"] <= 0:
-                timeLeftColor = RED_COLOR
-            originalInfoLine += (
-                ", l"
-                + timeLeftColor
-                + self.convertMsToHours(self.issue_progress["timeLeft"], False)
-                + ENDTERM
-            )
-            timeLeftColor = GREEN_COLOR
-            if self.issue_progress["timeLeftOriginal"] <= 0:
-                timeLeftColor = RED_COLOR
-            originalInfoLine += (
-                ", lo"
-                + timeLeftColor
-                + self.convertMsToHours(self.issue_progress["timeLeftOriginal"])
-                + ENDTERM
-            )
-
-        if self.issue_aggregate_progress["total"] > 0 and self.issue_has_subtasks:
-            if len(originalInfoLine) > 0:
-                originalInfoLine += "\r\n"
-            originalInfoLine += (
-                "Aggregated: e"
-                + self.convertMsToHours(self.issue_aggregate_progress["originalEstimate"])
-                + ", p"
-            )
-            totalColor = ""
-            totalEndColor = ""
-            if (
-                self.issue_aggregate_progress["total"]
-                > self.issue_aggregate_progress["originalEstimate"]
-            ):
-                totalColor = WARN_COLOR
-                totalEndColor = ENDTERM
-            originalInfoLine += (
-                self.convertMsToHours(self.issue_aggregate_progress["progress"], False)
-                + "/"
-                + totalColor
-                + self.convertMsToHours(self.issue_aggregate_progress["total"])
-                + totalEndColor
-            )
-            originalInfoLine += (
-                ", " + str(self.issue_aggregate_progress["progressPercent"]) + "%"
-            )
-
-            timeLeftColor = GREEN_COLOR
-            if self.issue_aggregate_progress["timeLeft"] <= 0:
-                timeLeftColor = RED_COLOR
-            originalInfoLine += (
-                ", l"
-                + timeLeftColor
-                + self.convertMsToHours(self.issue_aggregate_progress["timeLeft"], False)
-                + ENDTERM
-            )
-            timeLeftColor = GREEN_COLOR
-            if self.issue_aggregate_progress["timeLeftOriginal"] <= 0:
-                timeLeftColor = RED_COLOR
-            originalInfoLine += (
-                ", lo"
-                + timeLeftColor
-                + self.convertMsToHours(self.issue_aggregate_progress["timeLeftOriginal"])
-                + ENDTERM
-            )
-
-        return originalInfoLine
-
     def print_subtasks_stats(self):
         if self.issue_has_subtasks:
             print("")
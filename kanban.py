@@ -1,10 +1,30 @@
 #!/usr/bin/env python
 
 import configparser
+import signal
 import sys
-from jiraparser import JiraJSONParser, TokenAuth
+import time
 import requests
-from requests.auth import AuthBase
+from boardrender import (
+    BoardRenderer,
+    DEFAULT_OUTPUT_FORMAT,
+    OUTPUT_FORMATS,
+    output_format_argument,
+)
+from boardreport import print_issues
+from boardsnapshot import BoardSnapshot
+from burndown import DEFAULT_BURNDOWN_DAYS, Burndown
+from hierarchy import HierarchyIndex
+from issuearchive import IssueArchive, IssueArchiveWriter
+from profiler import PROFILER
+from worklogstore import WorklogStore
+from jiraparser import (
+    JiraJSONParser,
+    JiraRequestError,
+    RED_COLOR,
+    ENDTERM,
+    SEARCH_PAGE_SIZE,
+)
 
 """ Getting a list of issues connected to a board id (defined by configuration) and printing analysis information """
 
@@ -12,65 +32,255 @@ from requests.auth import AuthBase
 config = configparser.ConfigParser()
 config.read("config.ini")
 
+# --profile prints time spent per phase at exit, --trace FILE records it,
+# --format jsonl|csv prints issues as rows for other tools
+output_format, _ = output_format_argument(
+    PROFILER.configure(sys.argv[1:]),
+    config["default"].get("outputFormat", DEFAULT_OUTPUT_FORMAT),
+)
+if output_format not in OUTPUT_FORMATS:
+    print(RED_COLOR + "Warning" + ENDTERM + ": unknown output format " + output_format)
+    print("Supported formats: " + ",".join(OUTPUT_FORMATS))
+    exit(1)
+board_renderer = BoardRenderer.new(output_format, sys.stdout)
+# the rest of the report follows the issues, unless stdout gets rows only
+report_out = sys.stdout
+if output_format != DEFAULT_OUTPUT_FORMAT:
+    report_out = sys.stderr
+    PROFILER.summary_stream = sys.stderr
+    # a reader leaving early (e.g. head) ends the run quietly
+    if hasattr(signal, "SIGPIPE"):
+        signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+
 # prepare parameters
-# if there is a Board in config (filterId) ->
-if "filterId" in config["default"]:
-    jsql_query = JiraJSONParser.form_jql_query(
-        projectId=config["default"]["issueKey"],
-        filter=int(config["default"]["filterId"]),
-        taskTypes=["Story", "Task"],
+board_query = JiraJSONParser.board_query_from_config(config["default"])
+jsql_query = JiraJSONParser.form_jql_query(**board_query)
+
+board_snapshot = BoardSnapshot.from_config(config["default"], jsql_query)
+issue_fields = JiraJSONParser.fields_from_config(config["default"])
+# snapshot keeps issues in board order
+if board_snapshot is not None:
+    issue_fields = JiraJSONParser.project_fields(issue_fields, ["created"])
+
+epic_field = config["default"].get("epicLinkField", "parent")
+# offline analysis of an exported board / export of the analysed issues
+offline_archive = IssueArchive.from_config(config["default"])
+issue_archive = IssueArchiveWriter.from_config(config["default"], epic_field)
+
+# board rollups (totals by status, type, ...) are printed after the issues
+rollup_dimensions = [
+    dimension.strip()
+    for dimension in config["default"].get("rollups", "").split(",")
+    if dimension.strip()
+]
+board_columns = None
+if len(rollup_dimensions) > 0:
+    # NumPy is needed for the rollups only
+    try:
+        from boardstats import BoardColumns, ROLLUP_DIMENSIONS
+    except ImportError:
+        print(
+            RED_COLOR
+            + "Warning"
+            + ENDTERM
+            + ": rollups need NumPy (pip install numpy)",
+            file=report_out,
+        )
+        exit(1)
+
+    for dimension in rollup_dimensions:
+        if dimension not in ROLLUP_DIMENSIONS:
+            print(
+                RED_COLOR + "Warning" + ENDTERM + ": unknown rollup " + dimension,
+                file=report_out,
+            )
+            print("Supported rollups: " + ",".join(ROLLUP_DIMENSIONS), file=report_out)
+            exit(1)
+    board_columns = BoardColumns(epic_field)
+    issue_fields = JiraJSONParser.project_fields(issue_fields, board_columns.fields())
+
+# epics rollups out of board issues and their sub-tasks
+board_hierarchy = None
+if config["default"].getboolean("epicRollup", False):
+    board_hierarchy = HierarchyIndex(epic_field)
+    issue_fields = JiraJSONParser.project_fields(issue_fields, board_hierarchy.fields())
+
+# board burndown out of synced worklogs
+worklog_store = WorklogStore.from_config(config["default"])
+board_burndown = None
+if worklog_store is not None:
+    board_burndown = Burndown(
+        config["default"].getint("burndownDays", DEFAULT_BURNDOWN_DAYS)
     )
-# if Board is not pointed ->
-else:
-    jsql_query = JiraJSONParser.form_jql_query(
-        projectId=config["default"]["issueKey"],
-        taskTypes=["Story", "Task"],
+
+
+def parse_and_fetch_subtasks(issues: list) -> tuple:
+    """Parse issues and fetch sub-tasks of all the stories among them at once"""
+    issue_parsers = []
+    for task in issues:
+        issue_parser = board_fetcher.new_parser()
+        issue_parser.parse_issue_json(task)
+        issue_parsers.append(issue_parser)
+
+    with PROFILER.phase("subtasks fetch"):
+        subtasks = board_fetcher.fetch_subtasks(
+            [parser.issue_key for parser in issue_parsers if parser.issue_has_subtasks]
+        )
+    return issue_parsers, subtasks
+
+
+def add_to_hierarchy(issues: list, subtasks: dict):
+    for task in issues:
+        board_hierarchy.add(task)
+        for subtask in subtasks.get(task["key"], {}).values():
+            board_hierarchy.add(subtask)
+
+
+def print_board(out) -> bool:
+    """Fetch board issues with parallel paging, printing every page as soon as
+    it is ready while the next ones are being fetched"""
+    all_printed = True
+    page_number = 0
+    for page in board_fetcher.search_pages(jsql_query, parallel=True):
+        if page_number == 0:
+            print("Issues found: {:d}".format(page["total"]), file=out)
+        page_number += 1
+
+        issue_parsers, page_subtasks = parse_and_fetch_subtasks(page["issues"])
+        with PROFILER.phase("render"):
+            all_printed = (
+                print_issues(issue_parsers, page_subtasks, board_renderer)
+                and all_printed
+            )
+        add_to_reports(page["issues"], issue_parsers, page_subtasks)
+        if board_snapshot is not None:
+            for task in page["issues"]:
+                board_snapshot.put(task, page_subtasks.get(task["key"], {}))
+
+    return all_printed
+
+
+def add_to_reports(issues: list, issue_parsers: list, subtasks: dict):
+    """Add printed issues to the rollups, burndown and export. Printing fetches
+    sub-tasks missing in search results, so they are complete by then."""
+    for task, issue_parser in zip(issues, issue_parsers):
+        task_subtasks = subtasks.get(task["key"], {})
+        if board_columns is not None:
+            board_columns.add(issue_parser.issue, task)
+        if board_hierarchy is not None:
+            add_to_hierarchy([task], {task["key"]: task_subtasks})
+        if board_burndown is not None:
+            board_burndown.add(issue_parser.issue, task, task_subtasks)
+        if issue_archive is not None:
+            issue_archive.put(task, task_subtasks)
+
+
+def refresh_snapshot(window_minutes: int):
+    """Merge issues updated within the last minutes into the board snapshot"""
+    changed, dropped_keys = board_fetcher.search_board_changes(
+        board_query, window_minutes, board_snapshot.keys()
     )
+    board_snapshot.remove(sorted(dropped_keys))
+    _, subtasks = parse_and_fetch_subtasks(changed)
+    for task in changed:
+        board_snapshot.put(task, subtasks.get(task["key"], {}))
 
-auth_token = config["default"]["authentication-token"]
-jira_base_api_url = config["default"]["jiraURL"] + "/rest/api/2/issue/"
-board_api_url = config["default"]["jiraURL"] + "/rest/api/2/search?jql=" + jsql_query
 
-# fetch board issues
-resp = requests.get(
-    board_api_url, auth=TokenAuth(auth_token), params={"Content-Type": "application/json"}
-)
+def print_stored(issues_count: int, stored_issues, out) -> bool:
+    """Print issues with their sub-tasks kept by a snapshot or an offline file,
+    a page of them at once"""
+    all_printed = True
+    print("Issues found: {:d}".format(issues_count), file=out)
+    # issues whose sub-tasks were fetched while printing
+    completed = []
+    page = []
+    for issue_json, subtasks in stored_issues:
+        page.append((issue_json, subtasks))
+        if len(page) == SEARCH_PAGE_SIZE:
+            all_printed = print_stored_page(page, completed) and all_printed
+            page = []
+    all_printed = print_stored_page(page, completed) and all_printed
 
-if resp.status_code != 200:
-    raise Exception("Board information has not been fetched")
+    # the snapshot is updated once read, offline files are read only
+    if board_snapshot is not None and offline_archive is None:
+        for issue_json, subtasks in completed:
+            board_snapshot.put(issue_json, subtasks)
+    return all_printed
 
-result = resp.json()
 
-print("max {:d} out of {:d}".format(result["maxResults"], result["total"]))
+def print_stored_page(page: list, completed: list) -> bool:
+    issues = [issue_json for issue_json, _ in page]
+    stored_subtasks = {issue_json["key"]: subtasks for issue_json, subtasks in page}
+    issue_parsers = []
+    for issue_json in issues:
+        issue_parser = board_fetcher.new_parser()
+        issue_parser.parse_issue_json(issue_json)
+        issue_parsers.append(issue_parser)
 
-narrowed_list = result["issues"]
-# narrowed_list = result["issues"][:3]
+    subtasks = dict(stored_subtasks)
+    with PROFILER.phase("render"):
+        all_printed = print_issues(issue_parsers, subtasks, board_renderer)
+    add_to_reports(issues, issue_parsers, subtasks)
+    for issue_json in issues:
+        if subtasks[issue_json["key"]] is not stored_subtasks[issue_json["key"]]:
+            completed.append((issue_json, subtasks[issue_json["key"]]))
+    return all_printed
 
-for task in narrowed_list:
-    # fetch issue info
-    issue_parser = JiraJSONParser(auth_token, jira_base_api_url)
-    issue_parser.parse_issue_json(task)
-    print(
-        "Issue: "
-        + task["key"]
-        + ", type: "
-        + issue_parser.issue_type_name
-        + ", status: "
-        + issue_parser.issue_status
+
+board_fetcher = JiraJSONParser.from_config(config["default"], issue_fields)
+if offline_archive is not None:
+    all_printed = print_stored(
+        offline_archive.count(), offline_archive.issues(), report_out
     )
+    offline_archive.close()
+elif board_snapshot is None:
+    all_printed = print_board(report_out)
+else:
+    run_started_at = time.time()
+    board_snapshot.begin()
+    window_minutes = board_snapshot.updated_window_minutes()
+    # full run now and then catches deleted issues and changed board filters
+    if window_minutes is None:
+        board_snapshot.clear()
+        all_printed = print_board(report_out)
+    else:
+        refresh_snapshot(window_minutes)
+        all_printed = print_stored(
+            board_snapshot.count(), board_snapshot.issues(), report_out
+        )
+
+    # keep the previous snapshot state if any issue has failed
+    if all_printed:
+        board_snapshot.finish(run_started_at, window_minutes is None)
+    board_snapshot.close()
+
+with PROFILER.phase("rollups"):
+    if board_columns is not None:
+        for dimension in rollup_dimensions:
+            board_columns.print_rollup(dimension, report_out)
+        board_columns.print_overrun_distribution(report_out)
+
+    if board_hierarchy is not None:
+        hierarchy_rollups = board_hierarchy.rollup()
+        board_hierarchy.print_epics(hierarchy_rollups, report_out)
+        board_hierarchy.print_mismatches(hierarchy_rollups, report_out)
+
+if board_burndown is not None:
+    # stored worklogs are used offline or if Jira fails
+    if offline_archive is None:
+        try:
+            with PROFILER.phase("worklogs sync"):
+                board_fetcher.sync_worklogs(worklog_store)
+        except (JiraRequestError, requests.RequestException) as error:
+            print(RED_COLOR + "Warning" + ENDTERM + ": " + str(error), file=report_out)
+    board_burndown.print_report(worklog_store, "Board burndown", report_out)
+    worklog_store.close()
+
+if issue_archive is not None:
+    issue_archive.close()
+
+board_fetcher.close()
 
-    # if there are subtasks - fetch them one by one
-    if issue_parser.issue_has_subtasks:
-        issue_parser.get_parse_subtasks(False)
-        if len(issue_parser.subtasks_wo_estimation) > 0:
-            print("Sub-tasks not estimated: " + ",".join(issue_parser.subtasks_wo_estimation))
-
-    # print progress in 1 line
-    progress_info_line = issue_parser.get_compact_progress_info()
-    if len(progress_info_line) > 0:
-        print(issue_parser.get_compact_progress_info())
-    # warn if there is no estimation for task/bug
-    elif issue_parser.issue_type_name.lower() != "story":
-        print("No estimation")
-
-    print("")
+# failed issues fail the run, as cron jobs expect
+if not all_printed:
+    exit(1)
@@ -0,0 +1,185 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+SUMMARY_HEADER_FORMAT = "{:<20} {:>7} {:>9} {:>8} {:>8} {:>8} {:>12}"
+SUMMARY_ROW_FORMAT = "{:<20.20} {:>7d} {:>9.3f} {:>8.1f} {:>8.1f} {:>8.1f} {:>12}"
+
+
+class Phase:
+    """A timed phase, details (e.g. bytes) can be added while it runs"""
+
+    def __init__(self, profiler: "Profiler", name: str, args: dict):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+
+    def add(self, **args):
+        self.args.update(args)
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.started_at, time.perf_counter(), self.args)
+
+
+class NoPhase:
+    """Stands in for Phase while profiling is off"""
+
+    def add(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+NO_PHASE = NoPhase()
+
+
+# ==============================================================================
+class Profiler:
+    """Process wide record of HTTP requests and processing phases: counts,
+    latencies and bytes per phase name, counters (e.g. cache hits) and an
+    optional trace file in the Chrome trace event format (about://tracing,
+    ui.perfetto.dev). Does nothing until turned on."""
+
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.started_at = time.perf_counter()
+        # phase name: [seconds]
+        self.durations = {}
+        self.bytes = {}
+        self.counters = {}
+        self.trace_file = None
+        # stream of the summary printed at exit, stdout if None
+        self.summary_stream = None
+
+    def configure(self, arguments: list) -> list:
+        """Turn profiling on by the --profile and --trace FILE command line
+        arguments, the rest of the arguments is returned"""
+        rest = []
+        profile = False
+        tracePath = None
+        i = 0
+        while i < len(arguments):
+            if arguments[i] == "--profile":
+                profile = True
+            elif arguments[i] == "--trace" and i + 1 < len(arguments):
+                tracePath = arguments[i + 1]
+                i += 1
+            elif arguments[i].startswith("--trace="):
+                tracePath = arguments[i][len("--trace=") :]
+            else:
+                rest.append(arguments[i])
+            i += 1
+
+        if tracePath:
+            self.open_trace(tracePath)
+        if profile:
+            self.enabled = True
+            atexit.register(self.print_summary)
+        return rest
+
+    def open_trace(self, path: str):
+        self.enabled = True
+        self.trace_file = open(path, "w")
+        # the format allows a JSON array with no closing bracket,
+        # so events are written as they come
+        self.trace_file.write("[\n")
+        atexit.register(self.close)
+
+    def phase(self, name: str, **args) -> Phase:
+        """Context manager timing a phase: with PROFILER.phase("parse"): ..."""
+        if not self.enabled:
+            return NO_PHASE
+        return Phase(self, name, args)
+
+    def count(self, name: str, increment: int = 1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + increment
+
+    def record(self, name: str, startedAt: float, finishedAt: float, args: dict):
+        with self.lock:
+            self.durations.setdefault(name, []).append(finishedAt - startedAt)
+            if "bytes" in args:
+                self.bytes[name] = self.bytes.get(name, 0) + args["bytes"]
+            if self.trace_file is not None:
+                self.trace_file.write(
+                    json.dumps(
+                        {
+                            "name": name,
+                            "ph": "X",
+                            "ts": round((startedAt - self.started_at) * 1e6),
+                            "dur": round((finishedAt - startedAt) * 1e6),
+                            "pid": os.getpid(),
+                            "tid": threading.current_thread().name,
+                            "args": args,
+                        }
+                    )
+                    + ",\n"
+                )
+
+    @staticmethod
+    def percentile(sortedValues: list, share: float) -> float:
+        return sortedValues[min(len(sortedValues) - 1, int(len(sortedValues) * share))]
+
+    def summary(self) -> list:
+        """(phase, count, total seconds, p50 ms, p95 ms, max ms, bytes) rows"""
+        rows = []
+        with self.lock:
+            for name, durations in self.durations.items():
+                durations = sorted(durations)
+                rows.append(
+                    (
+                        name,
+                        len(durations),
+                        sum(durations),
+                        Profiler.percentile(durations, 0.5) * 1000,
+                        Profiler.percentile(durations, 0.95) * 1000,
+                        durations[-1] * 1000,
+                        self.bytes.get(name),
+                    )
+                )
+        return sorted(rows, key=lambda row: row[2], reverse=True)
+
+    def print_summary(self):
+        out = self.summary_stream
+        print("", file=out)
+        print(
+            "Profile, {:.3f}s:".format(time.perf_counter() - self.started_at),
+            file=out,
+        )
+        print(
+            SUMMARY_HEADER_FORMAT.format(
+                "phase", "count", "total s", "p50 ms", "p95 ms", "max ms", "bytes"
+            ),
+            file=out,
+        )
+        for row in self.summary():
+            print(
+                SUMMARY_ROW_FORMAT.format(
+                    *row[:6], "" if row[6] is None else "{:d}".format(row[6])
+                ),
+                file=out,
+            )
+        for name, value in sorted(self.counters.items()):
+            print("{}: {:d}".format(name, value), file=out)
+
+    def close(self):
+        with self.lock:
+            if self.trace_file is not None:
+                self.trace_file.close()
+                self.trace_file = None
+
+
+PROFILER = Profiler()
@@ -0,0 +1,45 @@
+import json
+import os
+import socket
+
+""" Talking to the index server over its Unix socket. Imports nothing heavy, so index.py answers fast when the server is up """
+
+DEFAULT_SERVER_SOCKET = "jira-index.sock"
+SERVER_TIMEOUT_SECONDS = 300
+
+
+def read_line(stream) -> dict:
+    line = stream.readline()
+    if not line.endswith(b"\n"):
+        raise ConnectionError("index server closed the connection")
+    return json.loads(line)
+
+
+def ask_server(socketPath: str, arguments: list):
+    """(exit code, output) of index.py run by the server, None if there is no
+    server listening on the socket or it did not answer to the end"""
+    if not hasattr(socket, "AF_UNIX") or not socketPath:
+        return None
+    if not os.path.exists(socketPath):
+        return None
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.settimeout(SERVER_TIMEOUT_SECONDS)
+        client.connect(socketPath)
+    except OSError:
+        # stale socket file of a stopped server
+        client.close()
+        return None
+
+    with client, client.makefile("rwb") as stream:
+        try:
+            stream.write(json.dumps({"args": arguments}).encode("utf-8") + b"\n")
+            stream.flush()
+            header = read_line(stream)
+            data = stream.read()
+            if len(data) != header["length"]:
+                raise ConnectionError("index server closed the connection")
+            return header["status"], data.decode("utf-8")
+        except OSError:
+            # server stopped or timed out meanwhile, nothing was printed yet
+            return None
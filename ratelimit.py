@@ -0,0 +1,115 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+DEFAULT_MAX_REQUESTS_PER_SECOND = 20.0
+MIN_REQUESTS_PER_SECOND = 0.5
+# requests per second added after every successful response
+RATE_INCREASE_STEP = 0.2
+# rate multiplier on a rate limit response / on a "near limit" warning
+RATE_DECREASE_FACTOR = 0.5
+NEAR_LIMIT_DECREASE_FACTOR = 0.8
+BACKOFF_BASE_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60.0
+
+
+# ==============================================================================
+class RateController:
+    """Client side rate limiter shared by all the request threads.
+    Requests are spaced to the current rate, which grows additively while Jira
+    answers fine and is cut multiplicatively on rate limit responses (AIMD),
+    so long runs stay just under the server limit."""
+
+    def __init__(
+        self,
+        maxRequestsPerSecond: float = DEFAULT_MAX_REQUESTS_PER_SECOND,
+    ):
+        self.max_rate = max(MIN_REQUESTS_PER_SECOND, maxRequestsPerSecond)
+        self.rate = self.max_rate
+        self.lock = threading.Lock()
+        # monotonic time the next request may be sent at
+        self.next_slot = 0.0
+        # set by Retry-After, holds back all the threads
+        self.paused_until = 0.0
+
+    def acquire(self):
+        """Wait for the slot of the next request"""
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_slot, self.paused_until)
+            self.next_slot = start + 1.0 / self.rate
+        if start > now:
+            time.sleep(start - now)
+
+    def update(self, statusCode: int, headers: dict):
+        """Adapt the rate to a Jira response"""
+        with self.lock:
+            if statusCode == 429 or statusCode == 503:
+                self.rate = max(
+                    MIN_REQUESTS_PER_SECOND, self.rate * RATE_DECREASE_FACTOR
+                )
+                retryAfter = RateController.retry_after(headers)
+                if retryAfter is not None:
+                    self.paused_until = max(
+                        self.paused_until, time.monotonic() + retryAfter
+                    )
+                return
+
+            if headers.get("X-RateLimit-NearLimit", "").lower() == "true":
+                self.rate = max(
+                    MIN_REQUESTS_PER_SECOND, self.rate * NEAR_LIMIT_DECREASE_FACTOR
+                )
+            elif statusCode < 400:
+                self.rate = min(self.max_rate, self.rate + RATE_INCREASE_STEP)
+
+            # never faster than the requests left until the limit is reset
+            budgetRate = RateController.budget_rate(headers)
+            if budgetRate is not None:
+                self.rate = max(MIN_REQUESTS_PER_SECOND, min(self.rate, budgetRate))
+
+    def backoff(self, attempt: int, headers: dict = {}) -> float:
+        """Wait before retrying a failed request: Retry-After if Jira has sent
+        it, otherwise exponential backoff with full jitter"""
+        delay = RateController.retry_after(headers)
+        if delay is None:
+            delay = random.uniform(
+                0, min(MAX_BACKOFF_SECONDS, BACKOFF_BASE_SECONDS * 2**attempt)
+            )
+        time.sleep(delay)
+        return delay
+
+    @staticmethod
+    def retry_after(headers: dict) -> float:
+        """Retry-After header in seconds (delay or HTTP date), None if missing"""
+        value = headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retryAt = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        # HTTP dates are GMT, a date with no zone is parsed as a naive one
+        if retryAt.tzinfo is None:
+            retryAt = retryAt.replace(tzinfo=timezone.utc)
+        return max(0.0, (retryAt - datetime.now(timezone.utc)).total_seconds())
+
+    @staticmethod
+    def budget_rate(headers: dict) -> float:
+        """Requests per second left by X-RateLimit-Remaining/-Reset, None if
+        Jira has not sent them"""
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return None
+        try:
+            resetAt = datetime.fromisoformat(reset.replace("Z", "+00:00"))
+            secondsLeft = (resetAt - datetime.now(timezone.utc)).total_seconds()
+            return float(remaining) / max(1.0, secondsLeft)
+        except (TypeError, ValueError):
+            return None
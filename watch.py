@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+
+import configparser
+import math
+import sys
+import time
+import requests
+from boardrender import TextRenderer
+from boardsnapshot import DEFAULT_FULL_REFRESH_HOURS, UPDATED_WINDOW_MARGIN_MINUTES
+from boardwatch import (
+    BoardState,
+    DEFAULT_METRICS_HOST,
+    DEFAULT_METRICS_PORT,
+    DEFAULT_WATCH_INTERVAL_SECONDS,
+)
+from profiler import PROFILER
+from jiraparser import JiraJSONParser, JiraRequestError, RED_COLOR, ENDTERM
+
+""" Watching a board: issues are kept parsed in memory, changed ones are polled for, re-analysed and printed, board totals are served as Prometheus metrics """
+
+# read config
+config = configparser.ConfigParser()
+config.read("config.ini")
+
+# --profile prints time spent per phase at exit, --trace FILE records it
+PROFILER.configure(sys.argv[1:])
+
+# prepare parameters
+board_query = JiraJSONParser.board_query_from_config(config["default"])
+jsql_query = JiraJSONParser.form_jql_query(**board_query)
+
+board_state = BoardState(config["default"].get("epicLinkField", "parent"))
+issue_fields = JiraJSONParser.project_fields(
+    JiraJSONParser.fields_from_config(config["default"]), board_state.fields()
+)
+watch_interval = config["default"].getint(
+    "watchIntervalSeconds", DEFAULT_WATCH_INTERVAL_SECONDS
+)
+full_refresh_seconds = (
+    config["default"].getint("watchFullRefreshHours", DEFAULT_FULL_REFRESH_HOURS) * 3600
+)
+board_renderer = TextRenderer(sys.stdout)
+
+
+def analyse(issues: list) -> int:
+    """Parse issues with their sub-tasks into the board state, print the ones
+    which have changed and return how many they are"""
+    issue_parsers = []
+    for task in issues:
+        issue_parser = board_fetcher.new_parser()
+        issue_parser.parse_issue_json(task)
+        issue_parsers.append(issue_parser)
+    subtasks = board_fetcher.fetch_subtasks(
+        [parser.issue_key for parser in issue_parsers if parser.issue_has_subtasks]
+    )
+
+    changed_parsers = []
+    for task, issue_parser in zip(issues, issue_parsers):
+        if issue_parser.issue_has_subtasks:
+            issue_parser.parse_subtasks_json(subtasks.get(issue_parser.issue_key, {}))
+        if board_state.put(issue_parser.issue, task, issue_parser.subtasks_stats):
+            changed_parsers.append(issue_parser)
+
+    # sub-tasks are parsed already, the stats are rendered as they are
+    with PROFILER.phase("render"):
+        for issue_parser in changed_parsers:
+            board_renderer.issue(issue_parser.issue, issue_parser.subtasks_stats)
+        board_renderer.flush()
+    return len(changed_parsers)
+
+
+def full_refresh() -> int:
+    """Analyse the whole board, issues not found anymore are dropped"""
+    changed = 0
+    found_keys = set()
+    for page in board_fetcher.search_pages(jsql_query, parallel=True):
+        changed += analyse(page["issues"])
+        found_keys.update(issue["key"] for issue in page["issues"])
+    dropped_keys = board_state.keys() - found_keys
+    board_state.remove(dropped_keys)
+    return changed + len(dropped_keys)
+
+
+def incremental_refresh(window_minutes: int) -> int:
+    """Analyse board issues updated within the last minutes"""
+    changed, dropped_keys = board_fetcher.search_board_changes(
+        board_query, window_minutes, board_state.keys()
+    )
+    board_state.remove(dropped_keys)
+    return analyse(changed) + len(dropped_keys)
+
+
+board_fetcher = JiraJSONParser.from_config(config["default"], issue_fields)
+metrics_server = board_state.serve_metrics(
+    config["default"].getint("metricsPort", DEFAULT_METRICS_PORT),
+    config["default"].get("metricsHost", DEFAULT_METRICS_HOST),
+)
+print(
+    "Serving metrics on http://{}:{:d}/metrics".format(
+        *metrics_server.server_address[:2]
+    )
+)
+print("", flush=True)
+
+last_started_at = None
+last_full_started_at = None
+try:
+    while True:
+        started_at = time.time()
+        try:
+            with PROFILER.phase("watch refresh"):
+                # full run now and then catches deleted issues and changed filters
+                if (
+                    last_full_started_at is None
+                    or last_full_started_at + full_refresh_seconds < started_at
+                ):
+                    changed = full_refresh()
+                    last_full_started_at = started_at
+                    board_state.stats["refreshes_full"] += 1
+                else:
+                    changed = incremental_refresh(
+                        math.ceil((started_at - last_started_at) / 60)
+                        + UPDATED_WINDOW_MARGIN_MINUTES
+                    )
+                    board_state.stats["refreshes_incremental"] += 1
+            # a failed refresh is covered by the window of the next one
+            last_started_at = started_at
+            board_state.stats["changed_issues"] += changed
+        except (JiraRequestError, requests.RequestException) as error:
+            print(RED_COLOR + "Warning" + ENDTERM + ": " + str(error))
+            print("", flush=True)
+            board_state.stats["refresh_errors"] += 1
+
+        board_state.stats["last_refresh_timestamp"] = time.time()
+        board_state.stats["last_refresh_seconds"] = time.time() - started_at
+        board_state.render_metrics()
+        time.sleep(max(0, started_at + watch_interval - time.time()))
+except KeyboardInterrupt:
+    pass
+
+metrics_server.shutdown()
+board_fetcher.close()
@@ -0,0 +1,83 @@
+import sqlite3
+import time
+from datetime import datetime
+
+DEFAULT_WORKLOG_DAYS = 90
+
+
+# ==============================================================================
+class WorklogStore:
+    """Local (SQLite) time series of logged time: worklogs of the whole Jira
+    installation synced by their update time, so following runs fetch only new,
+    edited and deleted worklogs. The first sync goes firstSyncDays back."""
+
+    def __init__(self, path: str, firstSyncDays: int = DEFAULT_WORKLOG_DAYS):
+        self.first_sync_days = firstSyncDays
+        self.db = sqlite3.connect(path, isolation_level=None)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS worklogs ("
+            " id TEXT PRIMARY KEY, issue_id TEXT NOT NULL,"
+            " started REAL NOT NULL, seconds INTEGER NOT NULL)"
+        )
+        self.db.execute(
+            "CREATE INDEX IF NOT EXISTS worklogs_started ON worklogs (started)"
+        )
+        # Unix time in milliseconds the next sync starts from
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS sync (id INTEGER PRIMARY KEY, since INTEGER)"
+        )
+
+    @staticmethod
+    def from_config(config) -> "WorklogStore":
+        """Store defined by a config section, None if it is not turned on"""
+        if "worklogFile" not in config:
+            return None
+        return WorklogStore(
+            config["worklogFile"],
+            config.getint("worklogDays", DEFAULT_WORKLOG_DAYS),
+        )
+
+    def since(self) -> int:
+        row = self.db.execute("SELECT since FROM sync WHERE id = 1").fetchone()
+        if row is None:
+            return int((time.time() - self.first_sync_days * 24 * 3600) * 1000)
+        return row[0]
+
+    def update(self, worklogs: list, deletedIds: list, until: int):
+        """Store synced worklogs (Jira JSON) and the cursor at once"""
+        self.db.execute("BEGIN")
+        self.db.executemany(
+            "INSERT OR REPLACE INTO worklogs VALUES (?, ?, ?, ?)",
+            [
+                (
+                    str(worklog["id"]),
+                    str(worklog["issueId"]),
+                    datetime.strptime(
+                        worklog["started"], "%Y-%m-%dT%H:%M:%S.%f%z"
+                    ).timestamp(),
+                    worklog["timeSpentSeconds"],
+                )
+                for worklog in worklogs
+            ],
+        )
+        self.db.executemany(
+            "DELETE FROM worklogs WHERE id = ?",
+            [(str(worklogId),) for worklogId in deletedIds],
+        )
+        self.db.execute("INSERT OR REPLACE INTO sync VALUES (1, ?)", (until,))
+        self.db.execute("COMMIT")
+
+    def daily_seconds(self, issueIds: set, sinceTimestamp: float) -> dict:
+        """{local date: seconds logged} on the issues since the time"""
+        daily = {}
+        for issueId, day, seconds in self.db.execute(
+            "SELECT issue_id, date(started, 'unixepoch', 'localtime'), SUM(seconds)"
+            " FROM worklogs WHERE started >= ? GROUP BY 1, 2",
+            (sinceTimestamp,),
+        ):
+            if issueId in issueIds:
+                daily[day] = daily.get(day, 0) + seconds
+        return daily
+
+    def close(self):
+        self.db.close()